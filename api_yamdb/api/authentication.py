@@ -0,0 +1,164 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import MyUser
+
+# Поля пользователя, которые кладутся в токен и восстанавливаются из него.
+USER_CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def get_access_token(user):
+    """Выпускает токен с ролью и именем пользователя в полезной нагрузке."""
+    token = AccessToken.for_user(user)
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def get_revocation_check():
+    path = getattr(settings, 'JWT_REVOCATION_CHECK', None)
+    return import_string(path) if path else None
+
+
+class UserCache:
+    """Кэш пользователей процесса: вытесняет давние записи (LRU)
+    и не отдаёт записи старше ``ttl`` секунд.
+
+    Если в настройке ``JWT_USER_CACHE_ALIAS`` указан кэш Django,
+    пользователи дополнительно хранятся в нём и доступны всем процессам.
+    """
+
+    def __init__(self, maxsize, ttl, alias=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.alias = alias
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def shared_key(user_id):
+        return f'jwt-user:{user_id}'
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                expires, user = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(user_id)
+                    return copy.copy(user)
+                del self.entries[user_id]
+        if self.alias is None:
+            return None
+        user = caches[self.alias].get(self.shared_key(user_id))
+        if user is not None:
+            self.set(user_id, user, shared=False)
+        return user
+
+    def set(self, user_id, user, shared=True):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        if shared and self.alias is not None:
+            caches[self.alias].set(
+                self.shared_key(user_id), user, timeout=self.ttl
+            )
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+        if self.alias is not None:
+            caches[self.alias].delete(self.shared_key(user_id))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 1000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+    alias=getattr(settings, 'JWT_USER_CACHE_ALIAS', None),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, которая берёт пользователя из ``user_cache``.
+
+    Запись сбрасывается при сохранении и удалении пользователя, поэтому
+    смена роли или блокировка действуют сразу в этом процессе и не позже
+    чем через ``JWT_USER_CACHE_TTL`` секунд в остальных.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            user = copy.copy(user)
+        return user
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """JWT-аутентификация без запроса пользователя из базы для чтения.
+
+    Для безопасных запросов обычного пользователя он собирается из полей
+    токена как экземпляр ``MyUser`` с отложенными остальными полями.
+    Запросы на запись и запросы модераторов и администраторов проходят
+    через кэш пользователей: удаление, блокировка и смена роли действуют
+    для них сразу, а не после истечения токена. Функция из настройки
+    ``JWT_REVOCATION_CHECK`` получает токен и возвращает ``True``, если
+    он отозван; она проверяется для любого запроса.
+    """
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def trusts_claims(self, validated_token):
+        return (
+            getattr(self, 'read_only', False)
+            and all(claim in validated_token for claim in USER_CLAIMS)
+            and validated_token['role'] == 'user'
+            and not validated_token['is_superuser']
+        )
+
+    def get_user(self, validated_token):
+        revocation_check = get_revocation_check()
+        if revocation_check is not None and revocation_check(validated_token):
+            raise AuthenticationFailed(
+                'Токен отозван.', code='token_revoked'
+            )
+        if not self.trusts_claims(validated_token):
+            return super().get_user(validated_token)
+        claims = {
+            claim: validated_token[claim] for claim in USER_CLAIMS
+        }
+        claims[api_settings.USER_ID_FIELD] = (
+            validated_token[api_settings.USER_ID_CLAIM]
+        )
+        # from_db ожидает значения в порядке полей модели.
+        fields = [
+            field.attname for field in MyUser._meta.concrete_fields
+            if field.attname in claims
+        ]
+        return MyUser.from_db(
+            router.db_for_read(MyUser),
+            fields,
+            [claims[field] for field in fields],
+        )
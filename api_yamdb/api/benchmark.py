@@ -0,0 +1,322 @@
+"""Бюджеты SQL-запросов и времени ответа для эндпоинтов API.
+
+Используется тестами и командой ``benchmark_api``: набор данных создаётся
+функцией ``seed_dataset``, а ``run_benchmark`` выполняет запросы ко всем
+эндпоинтам и возвращает отчёт, пригодный для сравнения между релизами.
+"""
+import statistics
+import time
+from collections import namedtuple
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.authentication import get_access_token
+from reviews.models import Category, Comment, Genre, MyUser, Review, Title
+
+Endpoint = namedtuple(
+    'Endpoint',
+    ('name', 'method', 'url', 'role', 'max_queries', 'max_ms', 'data'),
+)
+
+BENCHMARK_CONFIRMATION_CODE = '123456'
+
+# Индексы под сценарии доступа API. Команда benchmark_api
+# --compare-indexes удаляет их и повторяет замеры.
+ACCESS_INDEXES = (
+    (Review, 'review_title_pub_date'),
+    (Comment, 'comment_review_pub_date'),
+    (Title, 'title_year'),
+    (Title, 'title_name'),
+)
+TITLE_GENRE_INDEX = 'title_genre_genre_title'
+
+# Обычный пользователь на чтение восстанавливается из токена без запроса
+# к базе, администратор загружается из базы при первом обращении и дальше
+# берётся из кэша пользователей. Списки с пагинацией по смещению
+# выполняют ещё и COUNT(*).
+ENDPOINTS = (
+    Endpoint('auth-signup', 'post', '/api/v1/auth/signup/', None, 8, 500,
+             lambda ctx, idx: {'username': f'bench_signup_{idx}',
+                               'email': f'bench_signup_{idx}@yamdb.fake'}),
+    Endpoint('auth-token', 'post', '/api/v1/auth/token/', None, 1, 200,
+             lambda ctx, idx: {
+                 'username': ctx['token_user'].username,
+                 'confirmation_code': BENCHMARK_CONFIRMATION_CODE,
+             }),
+    Endpoint('users-list', 'get', '/api/v1/users/', 'admin', 3, 200, None),
+    Endpoint('users-detail', 'get', '/api/v1/users/{username}/', 'admin',
+             2, 200, None),
+    Endpoint('users-search', 'get',
+             '/api/v1/users/?search={user_search}&search_mode=prefix'
+             '&role=user', 'admin', 3, 200, None),
+    Endpoint('users-me', 'get', '/api/v1/users/me/', 'user', 1, 200, None),
+    Endpoint('categories-list', 'get', '/api/v1/categories/', None, 2, 200,
+             None),
+    Endpoint('genres-list', 'get', '/api/v1/genres/', None, 2, 200, None),
+    Endpoint('titles-list', 'get', '/api/v1/titles/', None, 3, 300, None),
+    Endpoint('titles-list-filtered', 'get',
+             '/api/v1/titles/?genre={genre}&category={category}', None, 3,
+             300, None),
+    Endpoint('titles-list-by-year', 'get', '/api/v1/titles/?year={year}',
+             None, 3, 300, None),
+    Endpoint('titles-search', 'get', '/api/v1/titles/?search={search}',
+             None, 3, 300, None),
+    Endpoint('titles-detail', 'get', '/api/v1/titles/{title_id}/', None, 2,
+             200, None),
+    Endpoint('reviews-list', 'get', '/api/v1/titles/{title_id}/reviews/',
+             None, 3, 300, None),
+    Endpoint('reviews-list-cursor', 'get',
+             '/api/v1/titles/{title_id}/reviews/?pagination=cursor', None,
+             2, 300, None),
+    Endpoint('reviews-detail', 'get',
+             '/api/v1/titles/{title_id}/reviews/{review_id}/', None, 2, 200,
+             None),
+    Endpoint('comments-list', 'get',
+             '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+             None, 3, 300, None),
+    Endpoint('comments-list-cursor', 'get',
+             '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+             '?pagination=cursor', None, 2, 300, None),
+    Endpoint('comments-list-hot-deep', 'get',
+             '/api/v1/titles/{hot_title_id}/reviews/{hot_review_id}/'
+             'comments/?offset={hot_offset}', None, 3, 300, None),
+    Endpoint('comments-list-hot-cursor', 'get',
+             '/api/v1/titles/{hot_title_id}/reviews/{hot_review_id}/'
+             'comments/?pagination=cursor', None, 2, 300, None),
+    Endpoint('reviews-search', 'get',
+             '/api/v1/reviews/?search={review_search}', 'admin', 3, 300,
+             None),
+    Endpoint('comments-search', 'get',
+             '/api/v1/comments/?search={comment_search}', 'admin', 3, 300,
+             None),
+    Endpoint('comments-detail', 'get',
+             '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+             '{comment_id}/', None, 2, 200, None),
+)
+
+
+def seed_dataset(titles=1000, users=100, reviews_per_title=10,
+                 comments_per_review=2, hot_review_comments=0,
+                 batch_size=1000):
+    """Заполняет базу синтетическими данными пакетными вставками.
+
+    Одному отзыву («горячему») добавляется ещё ``hot_review_comments``
+    комментариев, чтобы проверить глубокие страницы длинной ветки.
+    """
+    reviews_per_title = min(reviews_per_title, users)
+    Category.objects.bulk_create(
+        Category(name=f'Категория {idx}', slug=f'bench-category-{idx}')
+        for idx in range(5)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {idx}', slug=f'bench-genre-{idx}')
+        for idx in range(10)
+    )
+    categories = list(Category.objects.filter(slug__startswith='bench-'))
+    genres = list(Genre.objects.filter(slug__startswith='bench-'))
+    MyUser.objects.bulk_create(
+        (MyUser(username=f'bench_user_{idx}',
+                username_lower=f'bench_user_{idx}',
+                email=f'bench_user_{idx}@yamdb.fake')
+         for idx in range(users)),
+        batch_size=batch_size,
+    )
+    authors = list(
+        MyUser.objects.filter(username__startswith='bench_user_')
+        .values_list('id', flat=True)
+    )
+    Title.objects.bulk_create(
+        (Title(name=f'Произведение {idx}', year=1900 + idx % 120,
+               description=f'Описание произведения {idx}',
+               category=categories[idx % len(categories)])
+         for idx in range(titles)),
+        batch_size=batch_size,
+    )
+    title_ids = list(Title.objects.values_list('id', flat=True))
+    Title.genre.through.objects.bulk_create(
+        (Title.genre.through(title_id=title_id,
+                             genre_id=genres[idx % len(genres)].id)
+         for idx, title_id in enumerate(title_ids)),
+        batch_size=batch_size,
+    )
+    Review.objects.bulk_create_reviews(
+        (Review(title_id=title_id, author_id=author_id,
+                text=f'Отзыв {author_id} о произведении {title_id}',
+                score=1 + (title_id + author_id) % 10)
+         for title_id in title_ids
+         for author_id in authors[:reviews_per_title]),
+        batch_size=batch_size,
+    )
+    Comment.objects.bulk_create(
+        (Comment(review_id=review_id, author_id=authors[idx % len(authors)],
+                 text=f'Комментарий {idx} к отзыву {review_id}')
+         for review_id in Review.objects.values_list('id', flat=True)
+         for idx in range(comments_per_review)),
+        batch_size=batch_size,
+    )
+    review = Review.objects.filter(comments__isnull=False).first()
+    hot_review = Review.objects.order_by('-pk').first()
+    Comment.objects.bulk_create(
+        (Comment(review=hot_review, author_id=authors[idx % len(authors)],
+                 text=f'Комментарий {idx} в горячей ветке')
+         for idx in range(hot_review_comments)),
+        batch_size=batch_size,
+    )
+    hot_comments = hot_review.comments.count()
+    return {
+        'admin': MyUser.objects.create(
+            username='bench_admin', email='bench_admin@yamdb.fake',
+            role='admin',
+        ),
+        'user': MyUser.objects.create(
+            username='bench_plain_user', email='bench_plain@yamdb.fake',
+        ),
+        'token_user': MyUser.objects.create(
+            username='bench_token', email='bench_token@yamdb.fake',
+            confirmation_code=BENCHMARK_CONFIRMATION_CODE,
+        ),
+        'url_kwargs': {
+            'username': f'bench_user_{users // 2}',
+            'user_search': f'BENCH_USER_{users // 2}',
+            'genre': genres[0].slug,
+            'category': categories[0].slug,
+            'year': 1900 + titles // 2 % 120,
+            'search': f'произведение {titles // 2}',
+            'title_id': review.title_id,
+            'review_id': review.id,
+            'comment_id': review.comments.values_list('id', flat=True)[0],
+            'hot_title_id': hot_review.title_id,
+            'hot_review_id': hot_review.id,
+            'hot_offset': max(hot_comments - 10, 0),
+            'review_search': f'произведении {review.title_id}',
+            'comment_search': f'отзыву {review.id}',
+        },
+        'dataset': {
+            'titles': Title.objects.count(),
+            'users': MyUser.objects.count(),
+            'reviews': Review.objects.count(),
+            'comments': Comment.objects.count(),
+            'hot_review_comments': hot_comments,
+        },
+    }
+
+
+def get_client(context, role):
+    client = APIClient()
+    if role is not None:
+        token = get_access_token(context[role])
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def drop_access_indexes():
+    """Удаляет индексы из ``ACCESS_INDEXES`` для замеров «до»."""
+    with connection.schema_editor() as editor:
+        for model, name in ACCESS_INDEXES:
+            index, = (
+                index for index in model._meta.indexes if index.name == name
+            )
+            editor.remove_index(model, index)
+        editor.execute(
+            f'DROP INDEX {editor.quote_name(TITLE_GENRE_INDEX)}'
+        )
+
+
+def explain_queries(queries):
+    """Планы выполнения SELECT-запросов из ``CaptureQueriesContext``."""
+    prefix = connection.ops.explain_query_prefix()
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(f'{prefix} {sql}')
+            plans.append({
+                'sql': sql,
+                'plan': [
+                    ' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()
+                ],
+            })
+    return plans
+
+
+def measure_endpoint(endpoint, context, repeat=5, explain=False):
+    """Возвращает медианное время и максимум запросов для эндпоинта.
+
+    Перед каждым замером кэш очищается, поэтому время и запросы
+    относятся к работе с базой, а не к кэшу ответов. Для GET-запросов
+    затем отдельно меряются повторные запросы с прогретым кэшем: их
+    медиана и число попаданий в кэш ответов. С ``explain`` в отчёт
+    попадают планы запросов первого обращения.
+    """
+    client = get_client(context, endpoint.role)
+    url = endpoint.url.format(**context['url_kwargs'])
+    timings = []
+    queries = 0
+    plans = None
+    status_code = None
+    for idx in range(repeat):
+        kwargs = {}
+        if endpoint.data is not None:
+            kwargs['data'] = endpoint.data(context, idx)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, endpoint.method)(url, **kwargs)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(captured.captured_queries))
+        status_code = response.status_code
+        if explain and plans is None:
+            plans = explain_queries(captured.captured_queries)
+    time_ms = round(statistics.median(timings), 2)
+    result = {
+        'name': endpoint.name,
+        'method': endpoint.method.upper(),
+        'url': url,
+        'status': status_code,
+        'queries': queries,
+        'max_queries': endpoint.max_queries,
+        'time_ms': time_ms,
+        'max_ms': endpoint.max_ms,
+        'ok': (
+            status_code < HTTPStatus.BAD_REQUEST
+            and queries <= endpoint.max_queries
+            and time_ms <= endpoint.max_ms
+        ),
+    }
+    if endpoint.method == 'get':
+        result.update(measure_cached(client, url, repeat))
+    if plans is not None:
+        result['plans'] = plans
+    return result
+
+
+def measure_cached(client, url, repeat):
+    """Медианное время повторных GET-запросов и попадания в кэш ответов."""
+    timings = []
+    hits = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        hits += response.get('X-Cache') == 'HIT'
+    return {
+        'cached_time_ms': round(statistics.median(timings), 2),
+        'cache_hits': hits,
+    }
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+def run_benchmark(context, endpoints=ENDPOINTS, repeat=5, explain=False):
+    return [
+        measure_endpoint(endpoint, context, repeat, explain)
+        for endpoint in endpoints
+    ]
@@ -0,0 +1,163 @@
+"""Пакетное создание и изменение произведений.
+
+Категории и жанры всех элементов загружаются двумя запросами, каждый
+элемент проверяется сериализатором без обращений к базе, а корректные
+элементы записываются пакетными вставками в одной транзакции.
+"""
+from django.db import transaction
+
+from api.cache import touch
+from api.serializers import TitleCreateUpdateSerializer
+from reviews.constants import MAX_VALUE_ID
+from reviews.models import Category, Genre, Title
+
+TITLE_BULK_MAX_ITEMS = 5000
+TITLE_BULK_BATCH_SIZE = 500
+
+
+def resolve_slugs(items):
+    """Загружает категории и жанры, упомянутые в элементах."""
+    category_slugs, genre_slugs = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get('category') is not None:
+            category_slugs.add(str(item['category']))
+        if isinstance(item.get('genre'), list):
+            genre_slugs.update(str(slug) for slug in item['genre'])
+    return {
+        Category: Category.objects.in_bulk(category_slugs, field_name='slug'),
+        Genre: Genre.objects.in_bulk(genre_slugs, field_name='slug'),
+    }
+
+
+def get_existing_titles(items):
+    """Загружает изменяемые произведения одним запросом.
+
+    Ключи - значения ``id`` в том виде, в каком они пришли в элементах.
+    Нечисловые id и id вне диапазона ключа не ищутся: такие элементы
+    получают ошибку «не найдено».
+    """
+    ids = {}
+    for item in items:
+        if isinstance(item, dict) and 'id' in item:
+            try:
+                pk = int(item['id'])
+            except (TypeError, ValueError):
+                continue
+            if 0 < pk <= MAX_VALUE_ID:
+                ids[item['id']] = pk
+    titles = Title.objects.in_bulk(set(ids.values()))
+    return {
+        key: titles[pk] for key, pk in ids.items() if pk in titles
+    }
+
+
+def write_genres(created, updated):
+    """Вставляет связи новых произведений и меняет разницу у изменённых."""
+    through = Title.genre.through
+    links = [
+        (title.pk, genre.pk)
+        for title, genres in created for genre in genres
+    ]
+    desired = {title.pk: {genre.pk for genre in genres}
+               for title, genres in updated}
+    stale = []
+    current = {pk: set() for pk in desired}
+    for link_id, title_id, genre_id in through.objects.filter(
+        title_id__in=desired
+    ).values_list('id', 'title_id', 'genre_id'):
+        current[title_id].add(genre_id)
+        if genre_id not in desired[title_id]:
+            stale.append(link_id)
+    for title_id, genre_ids in desired.items():
+        links.extend(
+            (title_id, genre_id)
+            for genre_id in genre_ids - current[title_id]
+        )
+    if stale:
+        through.objects.filter(id__in=stale).delete()
+    through.objects.bulk_create(
+        (through(title_id=title_id, genre_id=genre_id)
+         for title_id, genre_id in links),
+        batch_size=TITLE_BULK_BATCH_SIZE,
+    )
+
+
+def validate_items(items, context):
+    """Проверяет элементы и раскладывает корректные на новые и изменённые.
+
+    Возвращает результаты по элементам, списки ``(результат,
+    произведение, жанры)`` для создания и изменения и изменённые поля.
+    """
+    existing = get_existing_titles(items)
+    results, to_create, to_update, update_fields = [], [], [], set()
+    for index, item in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        instance = None
+        if isinstance(item, dict) and 'id' in item:
+            try:
+                instance = existing.get(item['id'])
+            except TypeError:
+                pass
+            if instance is None:
+                result.update(
+                    status='error',
+                    errors={'id': ['Произведение не найдено.']},
+                )
+                continue
+        serializer = TitleCreateUpdateSerializer(
+            instance, data=item, partial=instance is not None,
+            context=context,
+        )
+        if not serializer.is_valid():
+            result.update(status='error', errors=serializer.errors)
+            continue
+        data = dict(serializer.validated_data)
+        genres = data.pop('genre', None)
+        if instance is None:
+            to_create.append((result, Title(**data), genres))
+            continue
+        for field, value in data.items():
+            setattr(instance, field, value)
+        update_fields.update(data)
+        to_update.append((result, instance, genres))
+    return results, to_create, to_update, update_fields
+
+
+def bulk_save_titles(items, context):
+    """Создаёт элементы без ``id`` и частично изменяет элементы с ``id``.
+
+    Возвращает результаты по каждому элементу в исходном порядке:
+    ``created``/``updated`` с id произведения или ``error`` с ошибками
+    в формате сериализатора. Ошибочные элементы не мешают записи
+    остальных.
+    """
+    context = {**context, 'resolved_slugs': resolve_slugs(items)}
+    results, to_create, to_update, update_fields = validate_items(
+        items, context
+    )
+    with transaction.atomic():
+        Title.objects.bulk_create_titles(
+            [title for _, title, _ in to_create],
+            batch_size=TITLE_BULK_BATCH_SIZE,
+        )
+        if update_fields:
+            Title.objects.bulk_update(
+                [title for _, title, _ in to_update], update_fields,
+                batch_size=TITLE_BULK_BATCH_SIZE,
+            )
+        write_genres(
+            [(title, genres) for _, title, genres in to_create],
+            [(title, genres) for _, title, genres in to_update
+             if genres is not None],
+        )
+    for status, written in (('created', to_create), ('updated', to_update)):
+        for result, title, _ in written:
+            result.update(status=status, id=title.pk)
+    pks = [result['id'] for result in results if 'id' in result]
+    if pks:
+        # Пакетная запись не отправляет сигналы моделей.
+        touch('titles', *(f'title:{pk}' for pk in pks))
+    return results
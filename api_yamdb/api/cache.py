@@ -0,0 +1,72 @@
+"""Метки изменения данных и кэш ответов API.
+
+Каждая область данных (``categories``, ``titles``, ``title:<id>`` и т.д.)
+хранит в кэше время последнего изменения. Ключ закэшированного ответа
+включает метки всех областей, от которых ответ зависит, поэтому запись
+в любую из них делает старые ответы недоступными без явного удаления.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+STAMP_PREFIX = 'stamp:'
+RESPONSE_PREFIX = 'response:'
+STATS_PREFIX = 'response-cache:'
+
+
+def get_stamps(*scopes):
+    keys = [STAMP_PREFIX + scope for scope in scopes]
+    stamps = cache.get_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        # Метки нет (кэш очищен или запись вытеснена): считаем, что данные
+        # изменились сейчас. add не перетирает метку другого процесса.
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        stamps.update(cache.get_many(missing))
+    return [stamps.get(key, time.time()) for key in keys]
+
+
+def touch(*scopes):
+    """Отмечает изменение данных в перечисленных областях."""
+    now = time.time()
+    cache.set_many(
+        {STAMP_PREFIX + scope: now for scope in scopes}, timeout=None
+    )
+
+
+def response_cache_key(path, params, stamps):
+    raw = repr((path, params, stamps)).encode()
+    return RESPONSE_PREFIX + hashlib.md5(raw).hexdigest()
+
+
+def get_cached_response(key):
+    data = cache.get(key)
+    count_event('hits' if data is not None else 'misses')
+    return data
+
+
+def set_cached_response(key, data):
+    cache.set(
+        key, data, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+    )
+
+
+def count_event(event):
+    key = STATS_PREFIX + event
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счётчик вытеснен между add и incr - событие не учитываем.
+        pass
+
+
+def response_cache_stats():
+    return {
+        event: cache.get(STATS_PREFIX + event, 0)
+        for event in ('hits', 'misses')
+    }
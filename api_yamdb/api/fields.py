@@ -0,0 +1,67 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+def get_resolved(field, queryset):
+    """Объекты, заранее загруженные по слагам для пакетной обработки.
+
+    Пакетные операции кладут в контекст сериализатора ``resolved_slugs``:
+    словарь ``{модель: {слаг: объект}}``. Если модель там есть, слаги
+    проверяются по нему без запросов к базе.
+    """
+    return field.context.get('resolved_slugs', {}).get(queryset.model)
+
+
+class SlugManyRelatedField(serializers.ManyRelatedField):
+    """Список слагов, который загружает все объекты одним запросом ``IN``
+    и сообщает обо всех неизвестных слагах сразу."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        slugs = list(dict.fromkeys(str(slug) for slug in data))
+        queryset = child.get_queryset()
+        objects = get_resolved(self, queryset)
+        if objects is None:
+            objects = {
+                getattr(obj, child.slug_field): obj
+                for obj in queryset.filter(
+                    **{f'{child.slug_field}__in': slugs}
+                )
+            }
+        missing = [slug for slug in slugs if slug not in objects]
+        if missing:
+            raise serializers.ValidationError([
+                child.error_messages['does_not_exist'].format(
+                    slug_name=child.slug_field, value=slug
+                )
+                for slug in missing
+            ])
+        return [objects[slug] for slug in slugs]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    """``SlugRelatedField``, который с ``many=True`` проверяет слаги
+    одним запросом, а в пакетных операциях не обращается к базе."""
+
+    def to_internal_value(self, data):
+        objects = get_resolved(self, self.get_queryset())
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            return objects[str(data)]
+        except KeyError:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field, value=data
+            )
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SlugManyRelatedField(**list_kwargs)
@@ -1,6 +1,14 @@
+import sys
+
 import django_filters
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
+from reviews.models import MyUser, Title
+from reviews.search import match_expression, search_supported
 
-from reviews.models import Title
+SURROGATES = (0xD800, 0xDFFF)
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -15,3 +23,121 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ('genre', 'category', 'year', 'name')
+
+
+class UserFilter(django_filters.FilterSet):
+
+    class Meta:
+        model = MyUser
+        fields = ('role',)
+
+
+def next_prefix(prefix):
+    """Наименьшая строка больше всех строк, начинающихся с ``prefix``.
+
+    Если префикс состоит из последних символов Unicode, такой строки нет
+    и возвращается ``None``. Суррогаты пропускаются: в UTF-8 они не
+    кодируются.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if SURROGATES[0] <= code <= SURROGATES[1]:
+        code = SURROGATES[1] + 1
+    return prefix[:-1] + chr(code)
+
+
+class PrefixSearchFilter(SearchFilter):
+    """Поиск без учёта регистра по столбцам ``<поле>_lower``.
+
+    Модель хранит значение, приведённое к нижнему регистру в Python,
+    поэтому регистр учитывается и для кириллицы, в отличие от ``LOWER``
+    и ``LIKE`` в SQLite. По умолчанию слово ищется как подстрока. Поля
+    ``^поле`` из ``search_fields``, а при параметре ``search_mode=prefix``
+    все поля, ищутся по началу значения: оно сравнивается с диапазоном
+    ``[префикс, следующий префикс)``, запрос идёт по индексу, а
+    результаты упорядочены по этому столбцу. Поля без такого столбца
+    ищутся как в ``SearchFilter``.
+    """
+
+    search_mode_param = 'search_mode'
+
+    def get_condition(self, field, prefix_mode, model):
+        """Возвращает функцию условия для слова и столбец сортировки."""
+        if field[0] in self.lookup_prefixes and field[0] != '^':
+            lookup = self.construct_search(field)
+            return lambda term: Q(**{lookup: term}), None
+        prefix_mode = prefix_mode or field[0] == '^'
+        name = field.lstrip('^')
+        column = f'{name}_lower'
+        try:
+            model._meta.get_field(column)
+        except FieldDoesNotExist:
+            lookup = self.construct_search('^' * prefix_mode + name)
+            return lambda term: Q(**{lookup: term}), None
+        if not prefix_mode:
+            return (
+                lambda term: Q(**{f'{column}__contains': term.lower()}),
+                None,
+            )
+
+        def condition(term):
+            start = term.lower()
+            upper = next_prefix(start)
+            if upper is None:
+                return Q(**{f'{column}__gte': start})
+            return Q(**{f'{column}__gte': start, f'{column}__lt': upper})
+        return condition, column
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        prefix_mode = (
+            request.query_params.get(self.search_mode_param) == 'prefix'
+        )
+        conditions = [
+            self.get_condition(field, prefix_mode, queryset.model)
+            for field in search_fields
+        ]
+        for term in search_terms:
+            query = Q()
+            for condition, _ in conditions:
+                query |= condition(term)
+            queryset = queryset.filter(query)
+        ordering = [column for _, column in conditions if column]
+        if ordering:
+            queryset = queryset.order_by(ordering[0])
+        return queryset
+
+
+class FullTextSearchFilter(SearchFilter):
+    """Поиск по индексу FTS5 из атрибута представления ``search_index``.
+
+    Найденные записи сортируются по релевантности. Если индекс
+    недоступен, поиск идёт по ``search_fields`` через ``icontains``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        index = getattr(view, 'search_index', None)
+        expression = match_expression(
+            ' '.join(self.get_search_terms(request))
+        )
+        if (
+            index is None or not expression
+            or not search_supported(queryset.db)
+        ):
+            return super().filter_queryset(request, queryset, view)
+        meta = queryset.model._meta
+        return queryset.extra(
+            tables=[index],
+            where=[
+                f'{index}.rowid = {meta.db_table}.{meta.pk.column}',
+                f'{index} MATCH %s',
+            ],
+            params=[expression],
+            select={'search_rank': f'{index}.rank'},
+            order_by=['search_rank', 'pk'],
+        )
@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, F, Max, Subquery
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+MAIL_BATCH_SIZE = 100
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_DELAY = timedelta(minutes=1)
+MAIL_LEASE = timedelta(minutes=10)
+MAIL_LATENCY_WINDOW = timedelta(hours=1)
+
+
+def enqueue_mail(recipient, subject, message):
+    """Ставит письмо в очередь, отправит его команда send_queued_mail."""
+    return OutgoingEmail.objects.create(
+        recipient=recipient, subject=subject, message=message,
+    )
+
+
+def pending_mail(max_attempts=MAIL_MAX_ATTEMPTS):
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True, attempts__lt=max_attempts,
+    )
+
+
+class MailSender:
+    """Отправляет письма пачками через одно переиспользуемое соединение.
+
+    Соединение открывается при первой отправке и живёт между пачками;
+    после ошибки оно закрывается и открывается заново, а письмо,
+    не ушедшее через старое соединение, повторяется через новое.
+    """
+
+    def __init__(self):
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def send(self, messages):
+        """Возвращает ошибки отправки по порядку писем (None - успех).
+
+        Письма уходят по одному через общее соединение: так известно,
+        какие из них доставлены, и после ошибки повторно отправляются
+        только недоставленные. После ошибки соединение открывается
+        заново для следующего письма.
+        """
+        return [self.send_message(message) for message in messages]
+
+    def send_message(self, message):
+        # Сервер мог закрыть соединение, пока оно простаивало между
+        # пачками, поэтому после ошибки на уже открытом соединении письмо
+        # один раз повторяется через новое.
+        attempts = 1 if self.connection is None else 2
+        for _ in range(attempts):
+            try:
+                self.open()
+                self.connection.send_messages([message])
+                return None
+            except Exception as error:
+                self.close()
+                last_error = error
+        return last_error
+
+
+def claim_mail(batch_size=MAIL_BATCH_SIZE, max_attempts=MAIL_MAX_ATTEMPTS):
+    """Забирает пачку писем из очереди в короткой транзакции.
+
+    Письмам пачки ``next_attempt_at`` сдвигается на ``MAIL_LEASE``
+    вперёд: другие обработчики их не возьмут, а если обработчик упадёт,
+    письма вернутся в очередь после окончания аренды. Транзакция
+    начинается с UPDATE, поэтому SQLite сразу берёт блокировку записи
+    и не держит открытое чтение.
+    """
+    now = timezone.now()
+    lease_until = now + MAIL_LEASE
+    due = pending_mail(max_attempts).filter(next_attempt_at__lte=now)
+    with transaction.atomic():
+        due.filter(pk__in=Subquery(
+            due.order_by('next_attempt_at').values('pk')[:batch_size]
+        )).update(next_attempt_at=lease_until)
+        return list(
+            pending_mail(max_attempts)
+            .filter(next_attempt_at=lease_until)
+            .order_by('pk')
+        )
+
+
+def send_queued_mail(batch_size=MAIL_BATCH_SIZE,
+                     max_attempts=MAIL_MAX_ATTEMPTS, sender=None):
+    """Отправляет одну пачку писем из очереди.
+
+    Письма отправляются вне транзакции, чтобы медленный SMTP не
+    блокировал запись в базу. Неудачная отправка откладывается
+    с растущей задержкой, после ``max_attempts`` попыток письмо остаётся
+    в очереди с текстом ошибки. Возвращает число отправленных
+    и неотправленных писем.
+    """
+    if sender is None:
+        with MailSender() as sender:
+            return send_queued_mail(batch_size, max_attempts, sender)
+    sent = failed = 0
+    batch = claim_mail(batch_size, max_attempts)
+    if not batch:
+        return sent, failed
+    errors = sender.send([
+        EmailMessage(
+            subject=email.subject,
+            body=email.message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email.recipient],
+        )
+        for email in batch
+    ])
+    now = timezone.now()
+    for email, error in zip(batch, errors):
+        email.attempts += 1
+        if error is None:
+            email.sent_at = now
+            email.last_error = ''
+            sent += 1
+        else:
+            email.last_error = str(error)
+            email.next_attempt_at = (
+                now + MAIL_RETRY_DELAY * 2 ** email.attempts
+            )
+            failed += 1
+    with transaction.atomic():
+        OutgoingEmail.objects.bulk_update(
+            batch, ('attempts', 'last_error', 'next_attempt_at', 'sent_at')
+        )
+    return sent, failed
+
+
+def mail_queue_stats(max_attempts=MAIL_MAX_ATTEMPTS):
+    """Глубина очереди и задержка отправки за последний час в секундах."""
+    recent = OutgoingEmail.objects.filter(
+        sent_at__gte=timezone.now() - MAIL_LATENCY_WINDOW,
+    ).annotate(latency=F('sent_at') - F('created_at')).aggregate(
+        avg_latency=Avg('latency'), max_latency=Max('latency'),
+    )
+    return {
+        'pending': pending_mail(max_attempts).count(),
+        'failed': OutgoingEmail.objects.filter(
+            sent_at__isnull=True, attempts__gte=max_attempts,
+        ).count(),
+        'avg_latency': (
+            recent['avg_latency'].total_seconds()
+            if recent['avg_latency'] is not None else None
+        ),
+        'max_latency': (
+            recent['max_latency'].total_seconds()
+            if recent['max_latency'] is not None else None
+        ),
+    }
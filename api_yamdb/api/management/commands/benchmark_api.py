@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmark import (ENDPOINTS, drop_access_indexes, run_benchmark,
+                           seed_dataset)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database and check SQL query and response '
+        'time budgets for every API endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--reviews-per-title', type=int, default=10)
+        parser.add_argument('--comments-per-review', type=int, default=2)
+        parser.add_argument(
+            '--hot-review-comments', type=int, default=10000,
+            help='Extra comments on one review to measure deep pages.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Requests per endpoint, the median time is reported.',
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file.',
+        )
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Add query plans of the first request to the report.',
+        )
+        parser.add_argument(
+            '--compare-indexes', action='store_true',
+            help='Repeat the run without the access pattern indexes.',
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+        )
+        try:
+            context = seed_dataset(
+                titles=options['titles'],
+                users=options['users'],
+                reviews_per_title=options['reviews_per_title'],
+                comments_per_review=options['comments_per_review'],
+                hot_review_comments=options['hot_review_comments'],
+            )
+            results = run_benchmark(
+                context, ENDPOINTS, options['repeat'], options['explain']
+            )
+            without_indexes = None
+            if options['compare_indexes']:
+                drop_access_indexes()
+                without_indexes = run_benchmark(
+                    context, ENDPOINTS, options['repeat'], options['explain']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'dataset': context['dataset'],
+            'response_cache': {
+                'hits': sum(result.get('cache_hits', 0) for result in results),
+                'requests': sum(
+                    options['repeat'] for result in results
+                    if 'cache_hits' in result
+                ),
+            },
+            'results': results,
+        }
+        if without_indexes is not None:
+            report['without_indexes'] = without_indexes
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        for result in results:
+            style = self.style.SUCCESS if result['ok'] else self.style.ERROR
+            line = (
+                '{name:<26} {status} queries {queries}/{max_queries} '
+                'time {time_ms}/{max_ms} ms'.format(**result)
+            )
+            if 'cached_time_ms' in result:
+                line += ' cached {cached_time_ms} ms'.format(**result)
+            self.stdout.write(style(line))
+        for result in without_indexes or ():
+            self.stdout.write(
+                '{name:<26} without indexes: time {time_ms} ms'.format(
+                    **result
+                )
+            )
+        failed = [result['name'] for result in results if not result['ok']]
+        if failed:
+            raise CommandError(f'Budget exceeded: {", ".join(failed)}')
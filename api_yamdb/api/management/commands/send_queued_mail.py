@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.mail import (MAIL_BATCH_SIZE, MAIL_MAX_ATTEMPTS, MailSender,
+                      mail_queue_stats, send_queued_mail)
+
+
+class Command(BaseCommand):
+    help = 'Send emails waiting in the outgoing mail queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=MAIL_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAIL_MAX_ATTEMPTS,
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep draining the queue until interrupted.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep in --loop mode when the queue is empty.',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and send latency and exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in mail_queue_stats(
+                options['max_attempts']
+            ).items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        with MailSender() as sender:
+            while True:
+                sent, failed = self.drain(
+                    sender, options['batch_size'], options['max_attempts']
+                )
+                if sent or failed or options['verbosity'] > 1:
+                    self.stdout.write(f'Sent: {sent}, failed: {failed}.')
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
+
+    def drain(self, sender, batch_size, max_attempts):
+        sent = failed = 0
+        while True:
+            batch_sent, batch_failed = send_queued_mail(
+                batch_size, max_attempts, sender
+            )
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < batch_size:
+                return sent, failed
@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.cache import (get_cached_response, get_stamps, response_cache_key,
+                       set_cached_response)
+from reviews.constants import MAX_VALUE_ID
+
+
+class BaseCacheResponseMixin:
+    """Условные GET-запросы и кэш ответов по меткам изменения данных.
+
+    ``get_cache_scopes`` возвращает области данных, от которых зависит
+    ответ. По их меткам строятся ``ETag`` и ``Last-Modified``: если
+    клиент прислал актуальные значения, ответ 304 отдаётся без запросов
+    к базе. При ``cache_responses`` тело ответа ещё и кэшируется.
+    В ключ входят только параметры запроса из ``cache_query_params``.
+    """
+
+    cache_scopes = ()
+    cache_responses = True
+    cache_query_params = (
+        'limit', 'offset', 'cursor', 'pagination', 'count', 'search',
+        'genre', 'category', 'year', 'name',
+    )
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_cache_params(self, request):
+        return sorted(
+            (name, sorted(request.query_params.getlist(name)))
+            for name in self.cache_query_params
+            if name in request.query_params
+        )
+
+    def cached_response(self, view, request, *args, **kwargs):
+        stamps = get_stamps(*self.get_cache_scopes())
+        key = response_cache_key(
+            request.path, self.get_cache_params(request), stamps
+        )
+        etag = '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+        # Last-Modified точен до секунды: пока с последней записи не
+        # прошла секунда, запись в ту же секунду не изменила бы его,
+        # поэтому заголовок не отправляется и проверяется только ETag.
+        newest = max(stamps, default=0)
+        last_modified = (
+            int(newest) if time.time() - newest >= 1 else None
+        )
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified,
+        )
+        if not_modified is not None:
+            return not_modified
+        data = get_cached_response(key) if self.cache_responses else None
+        if data is not None:
+            response = Response(data, headers={'X-Cache': 'HIT'})
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if self.cache_responses:
+                set_cached_response(key, response.data)
+                response['X-Cache'] = 'MISS'
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CachedListMixin(BaseCacheResponseMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(BaseCacheResponseMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class NestedParentMixin:
+    """Родитель вложенного маршрута, загруженный один раз за запрос.
+
+    Объект ``parent_model`` ищется по id из ``parent_lookup_kwarg``
+    вместе с проверкой вышестоящих родителей из ``parent_scope`` - пар
+    ``(поле, kwarg URL)``, - одним запросом. Если цепочка не совпадает,
+    возвращается 404.
+    """
+
+    parent_model = None
+    parent_lookup_kwarg = None
+    parent_scope = ()
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            filters = {
+                field: self.kwargs[kwarg] for field, kwarg in self.parent_scope
+            }
+            self._parent = get_object_or_404(
+                self.parent_model,
+                pk=self.kwargs[self.parent_lookup_kwarg],
+                **filters,
+            )
+        return self._parent
+
+
+class BulkDeleteMixin:
+    """Удаление нескольких объектов одним запросом: ``{"ids": [...]}``.
+
+    Права проверяются сразу для всех объектов методом ``filter_writable``
+    классов разрешений представления. Удаляются только доступные
+    объекты, в ответе перечислены удалённые, запрещённые и не найденные.
+    """
+
+    @action(methods=('POST',), detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request, *args, **kwargs):
+        ids = (
+            request.data.get('ids') if isinstance(request.data, dict)
+            else None
+        )
+        if not isinstance(ids, list) or not all(
+            isinstance(pk, int) and not isinstance(pk, bool)
+            and 0 < pk <= MAX_VALUE_ID
+            for pk in ids
+        ):
+            return Response(
+                {'ids': ['Ожидается список id.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.get_queryset().filter(pk__in=ids)
+        found = set(queryset.values_list('pk', flat=True))
+        for permission in self.get_permissions():
+            if hasattr(permission, 'filter_writable'):
+                queryset = permission.filter_writable(request, queryset)
+        writable = set(queryset.values_list('pk', flat=True))
+        queryset.filter(pk__in=writable).delete()
+        return Response({
+            'deleted': sorted(writable),
+            'forbidden': sorted(found - writable),
+            'not_found': sorted(set(ids) - found),
+        })
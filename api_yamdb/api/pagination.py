@@ -0,0 +1,252 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination)
+
+from api.cache import get_stamps
+
+COUNT_PREFIX = 'count:'
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике PostgreSQL или ``None``.
+
+    SQLite без ANALYZE статистики не ведёт, там считаем точно.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row is not None and row[0] >= 0 else None
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """Пагинация по смещению с дешёвым подсчётом записей.
+
+    Число записей кэшируется на ``PAGINATION_COUNT_CACHE_TIMEOUT`` секунд
+    по тексту запроса и меткам областей данных представления, поэтому
+    страницы одного фильтра считают записи один раз, а запись данных
+    сбрасывает кэш; представления без ``get_cache_scopes`` считают
+    записи каждый раз. Для таблицы без фильтров больше
+    ``PAGINATION_COUNT_ESTIMATE_THRESHOLD`` строк отдаётся оценка
+    по статистике СУБД с заголовком ``X-Count-Estimated``. С параметром
+    ``count=false`` записи не считаются, а ``count`` в ответе равен
+    ``null``.
+    """
+
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.view = view
+        self.count_mode = 'exact'
+        if request.query_params.get(self.count_query_param) == 'false':
+            self.count_mode = 'omitted'
+            count = 0
+        else:
+            count = self.get_estimate(queryset)
+            if count is None:
+                count = self.get_count(queryset)
+            else:
+                self.count_mode = 'estimated'
+        # Лишняя запись показывает, есть ли следующая страница, даже если
+        # число записей оценено или взято из кэша и успело устареть.
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        if len(results) <= self.limit and (results or not self.offset):
+            # Последняя страница: число записей известно точно.
+            self.count = self.offset + len(results)
+            if self.count_mode == 'estimated':
+                self.count_mode = 'exact'
+        else:
+            self.count = max(count, self.offset + len(results))
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return results[:self.limit]
+
+    def get_estimate(self, queryset):
+        threshold = getattr(
+            settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', None
+        )
+        if threshold is None or queryset.query.where:
+            return None
+        estimate = estimate_count(queryset)
+        if estimate is None or estimate < threshold:
+            return None
+        return estimate
+
+    def get_count(self, queryset):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        if not hasattr(self.view, 'get_cache_scopes'):
+            # Без областей данных кэш нельзя сбросить при записи.
+            return super().get_count(queryset)
+        scopes = self.view.get_cache_scopes()
+        raw = repr((queryset.db, sql, params, get_stamps(*scopes)))
+        key = COUNT_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+            cache.set(key, count, timeout=timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count_mode == 'omitted':
+            response.data['count'] = None
+        elif self.count_mode == 'estimated':
+            response['X-Count-Estimated'] = 'true'
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count']['nullable'] = True
+        return response_schema
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсор по паре ``(pub_date, id)``.
+
+    ``CursorPagination`` ставит курсор только по первому полю сортировки
+    и обходит записи с одинаковой датой через OFFSET. Здесь позиция -
+    дата и id последней записи, она уникальна, поэтому страница
+    выбирается условием по обоим полям по индексу
+    ``(родитель, pub_date, id)`` без OFFSET и без подсчёта записей.
+    Ссылки строит ``CursorPagination``: при уникальных позициях смещение
+    в них всегда нулевое.
+    """
+
+    ordering = ('pub_date', 'id')
+    page_size_query_param = 'limit'
+    position_separator = '|'
+
+    def _get_position_from_instance(self, instance, ordering):
+        return (
+            f'{instance.pub_date.isoformat()}'
+            f'{self.position_separator}{instance.pk}'
+        )
+
+    def parse_position(self, position):
+        pub_date, _, pk = position.rpartition(self.position_separator)
+        try:
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+        queryset = queryset.order_by(*(
+            f'-{field}' if reverse else field for field in self.ordering
+        ))
+        if position is not None:
+            pub_date, pk = self.parse_position(position)
+            # (pub_date, id) > (дата, id): диапазон по pub_date берётся
+            # из индекса, id уточняет только записи с той же датой.
+            lookup = 'lt' if reverse else 'gt'
+            queryset = queryset.filter(
+                **{f'pub_date__{lookup}e': pub_date}
+            ).filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(**{f'id__{lookup}': pk})
+            )
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if len(results) > len(self.page) else None
+        )
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = True, position
+            self.has_previous = following_position is not None
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.next_position = following_position
+            self.has_previous = position is not None
+            self.previous_position = position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+
+class CursorOrOffsetPagination(BasePagination):
+    """Пагинация по смещению или по курсору на выбор клиента.
+
+    Курсор включается параметром ``pagination=cursor`` или наличием
+    параметра ``cursor``. Режим по умолчанию задаётся атрибутом
+    представления ``pagination_mode``.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    default_mode = 'offset'
+
+    def __init__(self):
+        self.paginators = {
+            'offset': CachedCountPagination(),
+            'cursor': PubDateCursorPagination(),
+        }
+        self.paginator = self.paginators[self.default_mode]
+
+    def get_mode(self, request, view):
+        if self.cursor_query_param in request.query_params:
+            return 'cursor'
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in self.paginators:
+            return mode
+        return getattr(view, 'pagination_mode', self.default_mode)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.paginators[self.get_mode(request, view)]
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        fields = {}
+        for paginator in self.paginators.values():
+            for field in paginator.get_schema_fields(view):
+                fields.setdefault(field.name, field)
+        return list(fields.values())
+
+    def get_schema_operation_parameters(self, view):
+        parameters = {}
+        for paginator in self.paginators.values():
+            for parameter in paginator.get_schema_operation_parameters(view):
+                parameters.setdefault(parameter['name'], parameter)
+        return list(parameters.values())
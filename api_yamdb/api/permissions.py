@@ -10,6 +10,16 @@ class IsAdminOrSuperUser(permissions.BasePermission):
         )
 
 
+class IsAdminOrModerator(permissions.BasePermission):
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_admin
+            or request.user.is_moderator
+            or request.user.is_superuser
+        )
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
 
     def has_permission(self, request, view):
@@ -28,11 +38,20 @@ class IsAdminIsModeratorIsAuthorOrReadOnly(permissions.BasePermission):
             or request.user.is_authenticated
         )
 
+    @staticmethod
+    def is_staff(user):
+        return user.is_admin or user.is_moderator or user.is_superuser
+
     def has_object_permission(self, request, view, obj):
+        # Сначала роль, затем id автора: сам автор из базы не загружается.
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
-            or request.user.is_admin
-            or request.user.is_moderator
-            or request.user.is_superuser
+            or self.is_staff(request.user)
+            or obj.author_id == request.user.id
         )
+
+    def filter_writable(self, request, queryset):
+        """Объекты из ``queryset``, которые пользователь может менять."""
+        if self.is_staff(request.user):
+            return queryset
+        return queryset.filter(author_id=request.user.id)
@@ -1,9 +1,10 @@
+import datetime
 import re
 
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.exceptions import NotFound
 
+from api.fields import BulkSlugRelatedField
 from api.utils import generate_and_send_confirmation_code
 from reviews.constants import MAX_VALUE_SCORE, MIN_VALUE_SCORE
 from reviews.models import Category, Comment, Genre, MyUser, Review, Title
@@ -117,11 +118,11 @@ class TitleSerializer(serializers.ModelSerializer):
 class TitleCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления произведений."""
 
-    category = serializers.SlugRelatedField(
+    category = BulkSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = BulkSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True
@@ -131,6 +132,27 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
         model = Title
         fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
+    def validate_year(self, value):
+        # Базу защищает триггер, здесь - понятная ошибка поля.
+        if value > datetime.date.today().year:
+            raise serializers.ValidationError(
+                'Год выпуска не может быть больше текущего.'
+            )
+        return value
+
+    def create(self, validated_data):
+        genres = validated_data.pop('genre')
+        instance = super().create(validated_data)
+        instance.set_genres(genres, created=True)
+        return instance
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        instance = super().update(instance, validated_data)
+        if genres is not None:
+            instance.set_genres(genres)
+        return instance
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор для работы с отзывами на произведения."""
@@ -156,17 +178,6 @@ class ReviewSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate(self, data):
-        title_id = self.context['view'].kwargs['title_id']
-        title = get_object_or_404(Title, pk=title_id)
-        user = self.context['request'].user
-        if (title.reviews.filter(author=user).exists()
-                and self.context['request'].method == 'POST'):
-            raise serializers.ValidationError(
-                'Вы уже оставляли отзыв на это произведение.'
-            )
-        return data
-
 
 class CommentSerializer(serializers.ModelSerializer):
     """Сериализатор для работы с комментариями к отзывам."""
@@ -180,3 +191,32 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ('id', 'author', 'review', 'pub_date', 'text')
         read_only_fields = ('review',)
+
+
+class ReviewSearchSerializer(serializers.ModelSerializer):
+    """Сериализатор для найденных отзывов по всем произведениям."""
+
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True,
+    )
+    title_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'title_id', 'author', 'pub_date', 'text', 'score')
+
+
+class CommentSearchSerializer(serializers.ModelSerializer):
+    """Сериализатор для найденных комментариев по всем отзывам."""
+
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True,
+    )
+    title_id = serializers.IntegerField(
+        source='review.title_id', read_only=True,
+    )
+    review_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'title_id', 'review_id', 'author', 'pub_date', 'text')
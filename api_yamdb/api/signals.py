@@ -0,0 +1,72 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import user_cache
+from api.cache import touch
+from reviews.models import (Category, Comment, Genre, MyUser, Review, Title,
+                            reviews_bulk_changed)
+
+
+@receiver((post_save, post_delete), sender=MyUser)
+def forget_cached_user(sender, instance, created=False, update_fields=None,
+                       **kwargs):
+    user_cache.delete(instance.pk)
+    touch('users')
+    username_saved = update_fields is None or 'username' in update_fields
+    if not created and username_saved and instance.username_changed:
+        # Имя автора выводится в отзывах и комментариях. Отзывы
+        # удалённого пользователя сбрасывают свои метки сами.
+        touch('usernames')
+
+
+@receiver((post_save, post_delete), sender=Category)
+def touch_categories(sender, **kwargs):
+    touch('categories')
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def touch_genres(sender, **kwargs):
+    touch('genres')
+
+
+@receiver((post_save, post_delete), sender=Title)
+def touch_title(sender, instance, **kwargs):
+    touch('titles', f'title:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_genres(sender, instance, reverse, pk_set, **kwargs):
+    if reverse:
+        # Изменён набор произведений жанра.
+        touch('titles', *(f'title:{pk}' for pk in pk_set or ()))
+    else:
+        touch('titles', f'title:{instance.pk}')
+
+
+@receiver((post_save, post_delete), sender=Review)
+def touch_review(sender, instance, **kwargs):
+    touch(
+        'titles',
+        'reviews',
+        f'title:{instance.title_id}:reviews',
+        f'review:{instance.pk}',
+    )
+
+
+@receiver(reviews_bulk_changed, sender=Review)
+def touch_bulk_reviews(sender, title_ids, review_ids, **kwargs):
+    touch(
+        'titles',
+        'reviews',
+        *(f'title:{pk}:reviews' for pk in title_ids),
+        *(f'review:{pk}' for pk in review_ids),
+    )
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def touch_comment(sender, instance, **kwargs):
+    touch(
+        'comments',
+        f'review:{instance.review_id}:comments',
+        f'comment:{instance.pk}',
+    )
@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
+from api.views import (CategoryViewSet, CommentSearchViewSet,
+                       CommentViewSet, GenreViewSet, ReviewSearchViewSet,
                        ReviewViewSet, TitleViewSet, TokenObtainView,
                        UserRegistrationView, UserViewSet)
 
@@ -17,6 +18,12 @@ v1_router.register(
     r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet, basename='comments'
 )
+v1_router.register(
+    'reviews', ReviewSearchViewSet, basename='reviews-search'
+)
+v1_router.register(
+    'comments', CommentSearchViewSet, basename='comments-search'
+)
 
 urlpatterns = [
     path(
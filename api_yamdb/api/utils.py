@@ -1,20 +1,18 @@
-from django.conf import settings
-from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
 
+from api.mail import enqueue_mail
 from reviews.constants import MAX_LENGTH_CONFIRMATION_CODE
 
 
 def generate_and_send_confirmation_code(user):
+    """Сохраняет новый код и ставит письмо с ним в очередь отправки."""
     confirmation_code = get_random_string(length=MAX_LENGTH_CONFIRMATION_CODE)
     user.confirmation_code = confirmation_code
-    user.save()
+    user.save(update_fields=('confirmation_code',))
 
-    send_mail(
+    enqueue_mail(
+        recipient=user.email,
         subject='Код подтверждения',
         message=f'Ваш код подтверждения: {confirmation_code}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False,
     )
     return confirmation_code
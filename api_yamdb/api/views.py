@@ -1,23 +1,34 @@
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as django_filters
 from rest_framework import generics, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
 
-from api.filters import TitleFilter
-from api.permissions import (IsAdminOrReadOnly, IsAdminOrSuperUser,
+from api.authentication import get_access_token
+from api.bulk import TITLE_BULK_MAX_ITEMS, bulk_save_titles
+from api.filters import (FullTextSearchFilter, PrefixSearchFilter,
+                         TitleFilter, UserFilter)
+from api.mixins import (BulkDeleteMixin, CachedListMixin,
+                        CachedRetrieveMixin, NestedParentMixin)
+from api.pagination import CachedCountPagination, CursorOrOffsetPagination
+from api.parsers import NDJSONParser
+from api.permissions import (IsAdminOrModerator, IsAdminOrReadOnly,
+                             IsAdminOrSuperUser,
                              IsAdminIsModeratorIsAuthorOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
-                             GenreSerializer, MyTokenObtainPairSerializer,
-                             ReviewSerializer, TitleCreateUpdateSerializer,
-                             TitleSerializer, UserRegistrationSerializer,
+from api.serializers import (CategorySerializer, CommentSearchSerializer,
+                             CommentSerializer, GenreSerializer,
+                             MyTokenObtainPairSerializer,
+                             ReviewSearchSerializer, ReviewSerializer,
+                             TitleCreateUpdateSerializer, TitleSerializer,
+                             UserRegistrationSerializer,
                              UsersSerializerForAdmin, UsersSerializerForUser)
 from api.utils import generate_and_send_confirmation_code
-from reviews.models import Category, Genre, MyUser, Review, Title
+from reviews.models import Category, Comment, Genre, MyUser, Review, Title
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -64,7 +75,7 @@ class TokenObtainView(generics.GenericAPIView):
         user = serializer.validated_data
 
         return Response(
-            {'token': str(AccessToken.for_user(user))},
+            {'token': str(get_access_token(user))},
             status=status.HTTP_200_OK
         )
 
@@ -75,7 +86,8 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = MyUser.objects.all()
     permission_classes = (IsAdminOrSuperUser, IsAuthenticated)
     serializer_class = UsersSerializerForAdmin
-    filter_backends = (SearchFilter,)
+    filter_backends = (django_filters.DjangoFilterBackend, PrefixSearchFilter)
+    filterset_class = UserFilter
     search_fields = ('username',)
     lookup_field = 'username'
     http_method_names = (
@@ -85,6 +97,10 @@ class UserViewSet(viewsets.ModelViewSet):
         'delete',
     )
 
+    def get_cache_scopes(self):
+        # Метка для кэша числа записей в пагинации.
+        return ('users',)
+
     @action(
         methods=(
             'GET',
@@ -95,22 +111,29 @@ class UserViewSet(viewsets.ModelViewSet):
         url_path='me',
     )
     def get_user(self, request):
+        user = request.user
+        if request.method == 'PATCH' or user.get_deferred_fields():
+            # Роль в токене или в кэше может быть устаревшей: сериализатор
+            # выбирается по актуальной записи, иначе пользователь со
+            # старым токеном администратора вернул бы себе роль.
+            user = get_object_or_404(MyUser, pk=user.pk)
         serializer_class = (
-            UsersSerializerForAdmin if request.user.is_admin
-            or request.user.is_superuser else UsersSerializerForUser
+            UsersSerializerForAdmin if user.is_admin
+            or user.is_superuser else UsersSerializerForUser
         )
         if request.method == 'PATCH':
             serializer = serializer_class(
-                request.user, data=request.data, partial=True
+                user, data=request.data, partial=True
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
-        serializer = serializer_class(request.user)
+        serializer = serializer_class(user)
         return Response(serializer.data)
 
 
 class CategoryViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -121,14 +144,16 @@ class CategoryViewSet(
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     lookup_field = 'slug'
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     http_method_names = ('get', 'post', 'delete')
+    cache_scopes = ('categories',)
 
 
 class GenreViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -139,79 +164,228 @@ class GenreViewSet(
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     lookup_field = 'slug'
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     http_method_names = ('get', 'post', 'delete')
+    cache_scopes = ('genres',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
     """Класс для работы с произведениями."""
 
     queryset = Title.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     http_method_names = (
         'get',
         'post',
         'patch',
         'delete',
     )
-    filter_backends = (django_filters.DjangoFilterBackend, SearchFilter)
+    filter_backends = (
+        django_filters.DjangoFilterBackend, FullTextSearchFilter
+    )
     filterset_class = TitleFilter
+    search_fields = ('name', 'description')
+    search_index = 'reviews_title_fts'
+
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            pk = self.kwargs['pk']
+            # Рейтинг зависит от отзывов произведения.
+            return (
+                f'title:{pk}', f'title:{pk}:reviews', 'categories', 'genres'
+            )
+        return ('titles', 'categories', 'genres')
+
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve']:
+            # Рейтинг хранится в самой таблице произведений, поэтому
+            # страница собирается одним запросом плюс выборка жанров.
+            return Title.objects.select_related(
+                'category'
+            ).prefetch_related('genre')
+        return Title.objects.all()
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return TitleSerializer
         return TitleCreateUpdateSerializer
 
-
-class CommentViewSet(viewsets.ModelViewSet):
+    @action(
+        methods=('POST',),
+        detail=False,
+        url_path='bulk',
+        parser_classes=(JSONParser, NDJSONParser),
+    )
+    def bulk(self, request):
+        """Создаёт и изменяет произведения пакетом из JSON-массива
+        или NDJSON, возвращает результат по каждому элементу."""
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Ожидается список произведений.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > TITLE_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': 'Слишком много произведений в одном запросе: '
+                           f'не больше {TITLE_BULK_MAX_ITEMS}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = bulk_save_titles(items, self.get_serializer_context())
+        failed = sum(result['status'] == 'error' for result in results)
+        if not failed:
+            response_status = status.HTTP_200_OK
+        elif failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response(results, status=response_status)
+
+
+class CommentViewSet(
+    NestedParentMixin,
+    BulkDeleteMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
     """Класс для работы с комментариями к отзывам."""
 
     serializer_class = CommentSerializer
     permission_classes = (IsAdminIsModeratorIsAuthorOrReadOnly,)
-    pagination_class = LimitOffsetPagination
-    ordering = ('pub_date',)
+    pagination_class = CursorOrOffsetPagination
     http_method_names = (
         'get',
         'post',
         'patch',
         'delete',
     )
+    filter_backends = (FullTextSearchFilter,)
+    search_fields = ('text',)
+    search_index = 'reviews_comment_fts'
+    parent_model = Review
+    parent_lookup_kwarg = 'review_id'
+    parent_scope = (('title_id', 'title_id'),)
 
-    def get_queryset(self):
+    cache_responses = False
+
+    def get_cache_scopes(self):
         review_id = self.kwargs['review_id']
-        review = get_object_or_404(Review, pk=review_id)
-        return review.comments.all()
+        scopes = [f'review:{review_id}', 'usernames']
+        if self.action == 'retrieve':
+            scopes.append(f'comment:{self.kwargs["pk"]}')
+        else:
+            scopes.append(f'review:{review_id}:comments')
+        return scopes
+
+    def get_queryset(self):
+        # Отзыв подставляется из менеджера связи, автор - из JOIN,
+        # порядок совпадает с индексом comment_review_pub_date.
+        return self.get_parent().comments.select_related('author').order_by(
+            'pub_date', 'id'
+        )
 
     def perform_create(self, serializer):
-        review_id = self.kwargs['review_id']
-        review = get_object_or_404(Review, pk=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    NestedParentMixin,
+    BulkDeleteMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
     """Класс для работы с отзывами на произведения."""
 
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminIsModeratorIsAuthorOrReadOnly,)
-    pagination_class = LimitOffsetPagination
-    ordering = ('pub_date',)
+    pagination_class = CursorOrOffsetPagination
     http_method_names = (
         'get',
         'post',
         'patch',
         'delete',
     )
+    filter_backends = (FullTextSearchFilter,)
+    search_fields = ('text',)
+    search_index = 'reviews_review_fts'
+    parent_model = Title
+    parent_lookup_kwarg = 'title_id'
 
-    def get_queryset(self):
+    cache_responses = False
+
+    def get_cache_scopes(self):
         title_id = self.kwargs['title_id']
-        title = get_object_or_404(Title, pk=title_id)
-        return title.reviews.all()
+        scopes = [f'title:{title_id}', 'usernames']
+        if self.action == 'retrieve':
+            scopes.append(f'review:{self.kwargs["pk"]}')
+        else:
+            scopes.append(f'title:{title_id}:reviews')
+        return scopes
+
+    def get_queryset(self):
+        # Произведение подставляется из менеджера связи, автор - из JOIN.
+        return self.get_parent().reviews.select_related('author').order_by(
+            'pub_date', 'id'
+        )
 
     def perform_create(self, serializer):
-        title_id = self.kwargs['title_id']
-        title = get_object_or_404(Title, pk=title_id)
-        serializer.save(author=self.request.user, title=title)
+        # Повторный отзыв отсекает ограничение unique_review при вставке,
+        # без отдельной проверки перед ней. Причину ошибки выясняем
+        # только после неё, не полагаясь на текст сообщения СУБД.
+        title = self.get_parent()
+        try:
+            serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            if title.reviews.filter(author_id=self.request.user.pk).exists():
+                raise ValidationError({'non_field_errors': [
+                    'Вы уже оставляли отзыв на это произведение.'
+                ]})
+            if not Title.objects.filter(pk=title.pk).exists():
+                raise NotFound('Произведение не найдено.')
+            raise ValidationError({'non_field_errors': [
+                'Не удалось сохранить отзыв.'
+            ]})
+
+
+class ReviewSearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Поиск по отзывам на все произведения для модераторов."""
+
+    queryset = Review.objects.select_related('author').order_by(
+        '-pub_date', '-id'
+    )
+    serializer_class = ReviewSearchSerializer
+    permission_classes = (IsAdminOrModerator,)
+    pagination_class = CachedCountPagination
+    filter_backends = (FullTextSearchFilter,)
+    search_fields = ('text',)
+    search_index = 'reviews_review_fts'
+
+    def get_cache_scopes(self):
+        return ('reviews',)
+
+
+class CommentSearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Поиск по комментариям ко всем отзывам для модераторов."""
+
+    queryset = Comment.objects.select_related('author', 'review').order_by(
+        '-pub_date', '-id'
+    )
+    serializer_class = CommentSearchSerializer
+    permission_classes = (IsAdminOrModerator,)
+    pagination_class = CachedCountPagination
+    filter_backends = (FullTextSearchFilter,)
+    search_fields = ('text',)
+    search_index = 'reviews_comment_fts'
+
+    def get_cache_scopes(self):
+        return ('comments',)
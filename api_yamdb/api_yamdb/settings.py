@@ -57,9 +57,9 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -75,6 +75,15 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Путь к функции, которая получает токен и возвращает True, если он отозван.
+JWT_REVOCATION_CHECK = None
+
+# Кэш пользователей для токенов без роли в полезной нагрузке: размер,
+# время жизни записи в секундах и необязательный общий кэш из CACHES.
+JWT_USER_CACHE_SIZE = 1000
+JWT_USER_CACHE_TTL = 60
+JWT_USER_CACHE_ALIAS = None
+
 
 # EMAIL_BACKEND = smtp_pass.EMAIL_BACKEND
 # EMAIL_HOST = smtp_pass.EMAIL_HOST
@@ -89,6 +98,21 @@ EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Метки изменения данных и кэш ответов API хранятся здесь. При нескольких
+# процессах нужен общий кэш (например, Redis или Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Число записей в списках кэшируется на указанное время в секундах, а для
+# таблиц без фильтров больше порога берётся оценка из статистики СУБД.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100000
+
 
 DATABASES = {
     'default': {
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from reviews.models import Category, Comment, Genre, MyUser, Review, Title
+from reviews.models import (Category, Comment, Genre, MyUser, OutgoingEmail,
+                            Review, Title)
 
 
 @admin.register(MyUser)
@@ -45,3 +46,13 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('id', 'review', 'author', 'text', 'pub_date')
     search_fields = ('review', 'author', 'text')
     list_filter = ('review', 'author')
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'recipient', 'subject', 'created_at', 'sent_at', 'attempts'
+    )
+    search_fields = ('recipient',)
+    list_filter = ('sent_at',)
+    empty_value_display = '-пусто-'
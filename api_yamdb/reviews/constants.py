@@ -4,5 +4,8 @@ MAX_LENGTH_EMAIL = 254
 MAX_LENGTH_USERNAME = 150
 MAX_LENGTH_CONFIRMATION_CODE = 6
 MAX_LENGTH_ROLE = 10
+MAX_LENGTH_SUBJECT = 256
 MIN_VALUE_SCORE = 1
 MAX_VALUE_SCORE = 10
+# Наибольший id: BigAutoField и INTEGER PRIMARY KEY в SQLite - 64 бита.
+MAX_VALUE_ID = 2 ** 63 - 1
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.search import (SEARCH_INDEXES, rebuild_search_index,
+                            search_supported)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild SQLite FTS5 full-text search indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes', nargs='*', metavar='index',
+            help=f'Indexes to rebuild: {", ".join(SEARCH_INDEXES)}. '
+                 'All by default.',
+        )
+
+    def handle(self, *args, **options):
+        if not search_supported():
+            raise CommandError(
+                'Full-text search indexes exist only on SQLite.'
+            )
+        indexes = options['indexes'] or list(SEARCH_INDEXES)
+        unknown = set(indexes) - set(SEARCH_INDEXES)
+        if unknown:
+            raise CommandError(
+                f'Unknown search indexes: {", ".join(sorted(unknown))}'
+            )
+        with transaction.atomic():
+            for index in indexes:
+                rebuild_search_index(index)
+        self.stdout.write(self.style.SUCCESS(
+            f'Search indexes rebuilt: {", ".join(indexes)}.'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Recalculate stored title ratings from reviews'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.all().recalculate_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f'Ratings recalculated for {updated} titles.')
+        )
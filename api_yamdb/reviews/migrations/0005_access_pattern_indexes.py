@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_comment_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year'], name='title_year'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name'], name='title_name'),
+        ),
+        # Фильтр произведений по жанру идёт от жанра к произведению:
+        # индекс покрывает запрос к промежуточной таблице целиком.
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX title_genre_genre_title '
+                'ON reviews_title_genre (genre_id, title_id);'
+            ),
+            reverse_sql='DROP INDEX title_genre_genre_title;',
+        ),
+    ]
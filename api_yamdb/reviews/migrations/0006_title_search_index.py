@@ -0,0 +1,63 @@
+# Generated by Django 3.2 on 2026-10-18 04:25
+
+from django.db import migrations
+
+# Индекс FTS5 с внешним содержимым: хранит только словарь, а текст
+# берёт из reviews_title. Триггеры поддерживают его при любой записи,
+# включая bulk_create и update.
+FORWARD_SQL = (
+    "CREATE VIRTUAL TABLE reviews_title_fts USING fts5("
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_title_fts_insert AFTER INSERT ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); "
+    "END",
+    "CREATE TRIGGER reviews_title_fts_delete AFTER DELETE ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+    "CREATE TRIGGER reviews_title_fts_update "
+    "AFTER UPDATE OF name, description ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); "
+    "END",
+    # Совпадение в названии весит больше совпадения в описании.
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+)
+
+REVERSE_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(FORWARD_SQL), run_on_sqlite(REVERSE_SQL),
+        ),
+    ]
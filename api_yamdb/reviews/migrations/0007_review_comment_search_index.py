@@ -0,0 +1,67 @@
+# Generated by Django 3.2 on 2026-10-18 04:28
+
+from django.db import migrations
+
+
+def fts_sql(table, columns):
+    """SQL индекса FTS5 над ``table`` и триггеров, которые его обновляют.
+
+    Устроено так же, как индекс произведений в 0006.
+    """
+    index = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = (
+        f"INSERT INTO {index}({index}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); "
+    )
+    insert = f'INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new}); '
+    forward = (
+        f"CREATE VIRTUAL TABLE {index} USING fts5({names}, "
+        f"content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER {index}_insert AFTER INSERT ON {table} '
+        f'BEGIN {insert}END',
+        f'CREATE TRIGGER {index}_delete AFTER DELETE ON {table} '
+        f'BEGIN {delete}END',
+        f'CREATE TRIGGER {index}_update AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete}{insert}END',
+        f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+    )
+    reverse = (
+        f'DROP TRIGGER IF EXISTS {index}_insert',
+        f'DROP TRIGGER IF EXISTS {index}_delete',
+        f'DROP TRIGGER IF EXISTS {index}_update',
+        f'DROP TABLE IF EXISTS {index}',
+    )
+    return forward, reverse
+
+
+REVIEW_SQL, REVIEW_REVERSE_SQL = fts_sql('reviews_review', ('text',))
+COMMENT_SQL, COMMENT_REVERSE_SQL = fts_sql('reviews_comment', ('text',))
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(REVIEW_SQL), run_on_sqlite(REVIEW_REVERSE_SQL),
+        ),
+        migrations.RunPython(
+            run_on_sqlite(COMMENT_SQL), run_on_sqlite(COMMENT_REVERSE_SQL),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_username_lower(apps, schema_editor):
+    """Заполняет имя в нижнем регистре пакетами по id."""
+    MyUser = apps.get_model('reviews', 'MyUser')
+    users = MyUser.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(
+            users.filter(pk__gt=last_pk).order_by('pk').only('username')[
+                :BATCH_SIZE
+            ]
+        )
+        if not batch:
+            break
+        for user in batch:
+            user.username_lower = user.username.lower()
+        users.bulk_update(batch, ['username_lower'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_comment_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myuser',
+            name='username_lower',
+            field=models.CharField(default='', editable=False, max_length=300, verbose_name='Имя пользователя в нижнем регистре'),
+        ),
+        migrations.RunPython(
+            fill_username_lower, migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='myuser',
+            index=models.Index(fields=['username_lower'], name='user_username_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='myuser',
+            index=models.Index(fields=['role', 'username_lower'], name='user_role_username_lower'),
+        ),
+    ]
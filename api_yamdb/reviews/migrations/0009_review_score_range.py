@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 04:42
+
+import importlib
+
+from django.db import migrations, models
+
+search_index = importlib.import_module(
+    'reviews.migrations.0007_review_comment_search_index'
+)
+
+# SQLite добавляет ограничение пересозданием таблицы, и триггеры
+# индекса FTS5 отзывов удаляются вместе со старой таблицей. Создаём их
+# заново и перестраиваем индекс - и после изменения, и после отката.
+RESTORE_TRIGGERS = search_index.run_on_sqlite(
+    search_index.REVIEW_SQL[1:]
+)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_username_lower'),
+    ]
+
+    operations = [
+        migrations.RunPython(noop, RESTORE_TRIGGERS),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(check=models.Q(('score__gte', 1), ('score__lte', 10)), name='review_score_range'),
+        ),
+        migrations.RunPython(RESTORE_TRIGGERS, noop),
+    ]
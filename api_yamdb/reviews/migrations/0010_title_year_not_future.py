@@ -0,0 +1,89 @@
+from django.db import migrations
+from django.db.models import Max
+from django.utils import timezone
+
+# CHECK не может ссылаться на текущую дату (SQLite запрещает в нём
+# недетерминированные функции), поэтому год проверяют триггеры.
+SQLITE_SQL = tuple(
+    f'CREATE TRIGGER reviews_title_year_{event.split()[0].lower()} '
+    f'BEFORE {event} ON reviews_title '
+    "WHEN new.year > CAST(strftime('%Y', 'now') AS INTEGER) "
+    "BEGIN SELECT RAISE(ABORT, 'title_year_not_future'); END"
+    for event in ('INSERT', 'UPDATE OF year')
+)
+SQLITE_REVERSE_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_year_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_year_update',
+)
+POSTGRESQL_SQL = (
+    'CREATE FUNCTION reviews_title_year_check() RETURNS trigger AS $$ '
+    'BEGIN '
+    'IF new.year > EXTRACT(YEAR FROM CURRENT_DATE) THEN '
+    "RAISE EXCEPTION 'title_year_not_future' "
+    "USING ERRCODE = 'check_violation'; "
+    'END IF; '
+    'RETURN new; '
+    'END; $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER reviews_title_year_check '
+    'BEFORE INSERT OR UPDATE OF year ON reviews_title '
+    'FOR EACH ROW EXECUTE PROCEDURE reviews_title_year_check()',
+)
+POSTGRESQL_REVERSE_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_year_check ON reviews_title',
+    'DROP FUNCTION IF EXISTS reviews_title_year_check()',
+)
+VALIDATE_BATCH_SIZE = 1000
+
+
+def check_title_years(apps, schema_editor):
+    """Проверяет существующие произведения пакетами по id.
+
+    Триггер не проверяет старые строки, поэтому до его создания ищем
+    произведения с годом из будущего и останавливаем миграцию.
+    """
+    Title = apps.get_model('reviews', 'Title')
+    titles = Title.objects.using(schema_editor.connection.alias)
+    year = timezone.now().year
+    last_pk = titles.aggregate(last=Max('pk'))['last'] or 0
+    invalid = []
+    for start in range(0, last_pk, VALIDATE_BATCH_SIZE):
+        invalid.extend(
+            titles.filter(
+                pk__gt=start, pk__lte=start + VALIDATE_BATCH_SIZE,
+                year__gt=year,
+            ).values_list('pk', flat=True)
+        )
+    if invalid:
+        raise ValueError(
+            'Год выпуска больше текущего у произведений с id: '
+            f'{", ".join(map(str, invalid[:20]))}. Исправьте их и '
+            'повторите миграцию.'
+        )
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, ()):
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_review_score_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_title_years, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_sql({
+                'sqlite': SQLITE_SQL, 'postgresql': POSTGRESQL_SQL,
+            }),
+            run_sql({
+                'sqlite': SQLITE_REVERSE_SQL,
+                'postgresql': POSTGRESQL_REVERSE_SQL,
+            }),
+        ),
+    ]
@@ -1,13 +1,16 @@
-import datetime
-
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+from django.dispatch import Signal
+from django.utils import timezone
 
 from reviews.constants import (MAX_LENGTH_CONFIRMATION_CODE, MAX_LENGTH_EMAIL,
                                MAX_LENGTH_NAME, MAX_LENGTH_ROLE,
-                               MAX_LENGTH_SLUG, MAX_LENGTH_USERNAME,
-                               MAX_VALUE_SCORE, MIN_VALUE_SCORE)
+                               MAX_LENGTH_SLUG, MAX_LENGTH_SUBJECT,
+                               MAX_LENGTH_USERNAME, MAX_VALUE_SCORE,
+                               MIN_VALUE_SCORE)
 
 
 class MyUser(AbstractUser):
@@ -40,10 +43,51 @@ class MyUser(AbstractUser):
         ],
         default='user',
     )
+    # LOWER в SQLite меняет регистр только латиницы, поэтому имя для
+    # поиска без учёта регистра приводится к нижнему регистру в Python.
+    # str.lower() может удлинить строку, отсюда запас по длине.
+    username_lower = models.CharField(
+        'Имя пользователя в нижнем регистре',
+        max_length=MAX_LENGTH_USERNAME * 2,
+        editable=False,
+        default='',
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            # Поиск по имени без учёта регистра, в том числе внутри
+            # роли: см. api.filters.PrefixSearchFilter.
+            models.Index(
+                fields=['username_lower'], name='user_username_lower',
+            ),
+            models.Index(
+                fields=['role', 'username_lower'],
+                name='user_role_username_lower',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем сохранённое имя, чтобы отличать его смену от других
+        # изменений пользователя.
+        instance._saved_username = instance.__dict__.get('username')
+        return instance
+
+    @property
+    def username_changed(self):
+        """Имя отличается от сохранённого в базе или оно неизвестно."""
+        return getattr(self, '_saved_username', None) != self.username
+
+    def save(self, *args, **kwargs):
+        self.username_lower = self.username.lower()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'username' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'username_lower'}
+        super().save(*args, **kwargs)
+        self._saved_username = self.username
 
     def __str__(self):
         return self.username
@@ -89,6 +133,61 @@ class Genre(BaseNameSlugModel):
         verbose_name_plural = 'Жанры'
 
 
+# Пакетные операции над отзывами не отправляют post_save, поэтому
+# о них сообщает этот сигнал с id затронутых произведений и отзывов.
+reviews_bulk_changed = Signal()
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class TitleQuerySet(models.QuerySet):
+    """Произведения.
+
+    Год выпуска не больше текущего проверяют триггеры базы (миграция
+    0010), поэтому произведения можно писать пакетно, минуя ``save``.
+    """
+
+    def bulk_create_titles(self, titles, batch_size=None):
+        """Вставляет произведения пакетно и проставляет им id.
+
+        SQLite в Django 3.2 не возвращает id из bulk_create. Внутри
+        транзакции запись в базу заблокирована для других, поэтому
+        вставленные строки - последние ``len(titles)`` id по порядку.
+        """
+        titles = list(titles)
+        with transaction.atomic(using=self.db):
+            self.bulk_create(titles, batch_size=batch_size)
+            if titles and titles[0].pk is None:
+                pks = self.model._base_manager.using(self.db).order_by(
+                    '-pk'
+                ).values_list('pk', flat=True)
+                for title, pk in zip(
+                    titles, reversed(list(pks[:len(titles)]))
+                ):
+                    title.pk = pk
+        return titles
+
+    def recalculate_ratings(self):
+        """Пересчитывает сохранённые суммы и количество оценок с нуля."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0,
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('id')).values('total')),
+                0,
+            ),
+        )
+
+
 class Title(models.Model):
     name = models.CharField(
         max_length=MAX_LENGTH_NAME,
@@ -112,26 +211,124 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория',
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок',
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество оценок',
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year'], name='title_year'),
+            models.Index(fields=['name'], name='title_name'),
+        ]
 
-    def save(self, *args, **kwargs):
-        year = int(self.year)
-        if year > datetime.datetime.now().year:
-            raise ValueError("Год выпуска не может быть больше текущего.")
-        super().save(*args, **kwargs)
+    def set_genres(self, genres, created=False):
+        """Приводит жанры произведения к ``genres``, меняя только разницу.
+
+        Текущие связи читаются одним запросом (для нового произведения
+        не читаются), лишние удаляются, недостающие вставляются пакетом.
+        Сигналы ``m2m_changed`` отправляются так же, как при add/remove.
+        """
+        through = Title.genre.through
+        desired = {genre.pk for genre in genres}
+        current = set() if created else set(
+            through.objects.filter(title_id=self.pk).values_list(
+                'genre_id', flat=True
+            )
+        )
+        changes = (
+            ('remove', current - desired),
+            ('add', desired - current),
+        )
+        with transaction.atomic():
+            for action, pk_set in changes:
+                if not pk_set:
+                    continue
+                self.send_genre_changed(f'pre_{action}', pk_set)
+                if action == 'remove':
+                    through.objects.filter(
+                        title_id=self.pk, genre_id__in=pk_set
+                    ).delete()
+                else:
+                    through.objects.bulk_create(
+                        through(title_id=self.pk, genre_id=pk)
+                        for pk in pk_set
+                    )
+                self.send_genre_changed(f'post_{action}', pk_set)
+
+    def send_genre_changed(self, action, pk_set):
+        m2m_changed.send(
+            sender=Title.genre.through, instance=self, action=action,
+            reverse=False, model=Genre, pk_set=set(pk_set),
+            using=self._state.db,
+        )
 
     @property
     def rating(self):
-        average = self.reviews.aggregate(Avg('score'))['score__avg']
-        return round(average) if average is not None else None
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count)
 
     def __str__(self):
         return self.name
 
 
+class ReviewQuerySet(models.QuerySet):
+    """Отзывы.
+
+    Диапазон оценки и единственность отзыва проверяют ограничения
+    ``review_score_range`` и ``unique_review``, поэтому отзывы можно
+    писать пакетно, минуя ``Review.save``. Рейтинги затронутых
+    произведений пересчитываются в той же транзакции, а после неё
+    отправляется сигнал ``reviews_bulk_changed``.
+    """
+
+    rating_batch_size = 500
+
+    def recalculate_ratings(self, title_ids):
+        titles = Title.objects.using(self.db)
+        for batch in chunks(title_ids, self.rating_batch_size):
+            titles.filter(pk__in=batch).recalculate_ratings()
+
+    def bulk_create_reviews(self, reviews, batch_size=None):
+        """Вставляет отзывы пакетно и пересчитывает рейтинги."""
+        reviews = list(reviews)
+        title_ids = {review.title_id for review in reviews}
+        with transaction.atomic(using=self.db):
+            self.bulk_create(reviews, batch_size=batch_size)
+            self.recalculate_ratings(title_ids)
+        self.send_bulk_changed(
+            title_ids, {review.pk for review in reviews if review.pk}
+        )
+        return reviews
+
+    def update_score(self, score):
+        """Меняет оценку отзывов выборки и пересчитывает рейтинги."""
+        with transaction.atomic(using=self.db):
+            rows = list(self.values_list('pk', 'title_id'))
+            updated = self.update(score=score)
+            title_ids = {title_id for _, title_id in rows}
+            self.recalculate_ratings(title_ids)
+        self.send_bulk_changed(title_ids, {pk for pk, _ in rows})
+        return updated
+
+    def send_bulk_changed(self, title_ids, review_ids):
+        reviews_bulk_changed.send(
+            sender=self.model, title_ids=title_ids, review_ids=review_ids,
+            using=self.db,
+        )
+
+
 class Review(models.Model):
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE,
@@ -147,22 +344,55 @@ class Review(models.Model):
     )
     score = models.PositiveIntegerField(verbose_name='Оценка')
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'отзыв'
         verbose_name_plural = 'Отзывы'
         constraints = [
             models.UniqueConstraint(fields=['title', 'author'],
                                     name='unique_review'),
+            models.CheckConstraint(
+                check=Q(score__gte=MIN_VALUE_SCORE,
+                        score__lte=MAX_VALUE_SCORE),
+                name='review_score_range',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date',
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем сохранённую оценку, чтобы не пересчитывать рейтинг
+        # произведения, если оценка не менялась.
+        instance._saved_score = instance.__dict__.get('score')
+        return instance
+
     def save(self, *args, **kwargs):
+        # Диапазон оценки и единственность отзыва проверяют ограничения
+        # review_score_range и unique_review в базе.
         score = int(self.score)
-        if not (MIN_VALUE_SCORE <= score <= MAX_VALUE_SCORE):
-            raise ValueError(
-                f'Введите целое число от {MIN_VALUE_SCORE}'
-                'до {MAX_VALUE_SCORE}.'
-            )
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        saved_score = getattr(self, '_saved_score', None)
+        titles = Title.objects.filter(pk=self.title_id)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                titles.update(
+                    rating_sum=F('rating_sum') + score,
+                    rating_count=F('rating_count') + 1,
+                )
+            elif saved_score != score:
+                # Разница со снимком оценки неверна, если отзыв параллельно
+                # изменили, поэтому рейтинг пересчитывается одним запросом
+                # по отзывам, видимым внутри транзакции.
+                titles.recalculate_ratings()
+        self._saved_score = score
 
     def __str__(self):
         return f'{self.author} о произведении "{self.title}"'
@@ -185,6 +415,44 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date',
+            ),
+        ]
 
     def __str__(self):
         return f'Комментарий №{self.id} к отзыву "{self.review}"'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку фоновым обработчиком."""
+
+    recipient = models.EmailField(
+        'Получатель',
+        max_length=MAX_LENGTH_EMAIL,
+    )
+    subject = models.CharField('Тема', max_length=MAX_LENGTH_SUBJECT)
+    message = models.TextField('Текст')
+    created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    sent_at = models.DateTimeField('Дата отправки', blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True, default='')
+
+    class Meta:
+        verbose_name = 'письмо'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(
+                fields=['sent_at', 'next_attempt_at'],
+                name='outgoing_email_pending',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} для {self.recipient}'
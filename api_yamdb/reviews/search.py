@@ -0,0 +1,41 @@
+"""Полнотекстовый поиск на SQLite FTS5.
+
+Индексы - таблицы FTS5 с внешним содержимым над таблицами моделей,
+их синхронизируют триггеры из миграций. На других СУБД индексов нет,
+и поиск идёт через ``icontains``.
+"""
+import re
+
+from django.db import connections
+
+# Индекс FTS5 и индексируемые столбцы исходной таблицы.
+SEARCH_INDEXES = {
+    'reviews_title_fts': ('name', 'description'),
+    'reviews_review_fts': ('text',),
+    'reviews_comment_fts': ('text',),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def search_supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def match_expression(text):
+    """Строит выражение MATCH: все слова обязательны и ищутся по префиксу.
+
+    Слова берутся в кавычки, поэтому синтаксис FTS5 в запросе клиента
+    не интерпретируется.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(text))
+
+
+def rebuild_search_index(index, using='default'):
+    """Перестраивает индекс по текущему содержимому исходной таблицы."""
+    connection = connections[using]
+    table = connection.ops.quote_name(index)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table}({table}) VALUES (%s)', ['rebuild']
+        )
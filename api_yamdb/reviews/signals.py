@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from reviews.models import Review, Title
+
+
+@receiver(post_delete, sender=Review)
+def subtract_review_score(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из рейтинга произведения.
+
+    Срабатывает и при каскадном удалении (например, вместе с автором)
+    внутри той же транзакции, что и само удаление. Рейтинг
+    пересчитывается по оставшимся отзывам: оценка в экземпляре могла
+    устареть, если отзыв параллельно изменили.
+    """
+    Title.objects.filter(pk=instance.title_id).recalculate_ratings()
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+from django.core.cache import cache
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +35,15 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # База очищается между тестами без сигналов об удалении, поэтому
+    # кэши пользователей и ответов API сбрасываются отдельно. Модуль
+    # api импортирует модели, поэтому его можно загрузить только после
+    # настройки Django.
+    from api.authentication import user_cache
+
+    user_cache.clear()
+    cache.clear()
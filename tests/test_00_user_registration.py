@@ -2,6 +2,7 @@ from http import HTTPStatus
 
 import pytest
 from django.core import mail
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 
 from tests.utils import (
@@ -112,6 +113,7 @@ class Test00UserRegistration:
         }
 
         response = client.post(self.URL_SIGNUP, data=valid_data)
+        call_command('send_queued_mail')
         outbox_after = mail.outbox  # email outbox after user create
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
@@ -161,6 +163,7 @@ class Test00UserRegistration:
         response = admin_client.post(
             self.URL_ADMIN_CREATE_USER, data=valid_data
         )
+        call_command('send_queued_mail')
         outbox_after = mail.outbox
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
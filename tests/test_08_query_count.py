@@ -0,0 +1,650 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, MyUser, Review, Title
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает ответ со статусом '
+        '200.'
+    )
+    return len(context.captured_queries)
+
+
+def client_count(client, url):
+    return client.get(url).json()['count']
+
+
+def revoke_all(token):
+    return True
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08QueryCount:
+
+    TITLES_URL = '/api/v1/titles/'
+    CATEGORIES_URL = '/api/v1/categories/'
+    TOKEN_URL = '/api/v1/auth/token/'
+    ME_URL = '/api/v1/users/me/'
+    PAGE_SIZES = (1, 10)
+
+    @pytest.fixture
+    def titles(self, user, moderator, admin):
+        genres = [
+            Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+            for idx in range(3)
+        ]
+        categories = [
+            Category.objects.create(name=f'Категория {idx}', slug=f'cat-{idx}')
+            for idx in range(2)
+        ]
+        titles = []
+        for idx in range(max(self.PAGE_SIZES)):
+            title = Title.objects.create(
+                name=f'Произведение {idx}',
+                year=2000,
+                category=categories[idx % len(categories)],
+            )
+            title.genre.set(genres[:idx % len(genres) + 1])
+            for score, author in enumerate((user, moderator, admin), 1):
+                Review.objects.create(
+                    title=title, author=author, text='текст', score=score
+                )
+            titles.append(title)
+        return titles
+
+    def test_01_titles_list_query_count(self, client, titles):
+        counts = {}
+        for limit in self.PAGE_SIZES:
+            # Число записей кэшируется, меряем каждую страницу с нуля.
+            cache.clear()
+            counts[limit] = count_queries(
+                client, f'{self.TITLES_URL}?limit={limit}'
+            )
+        assert len(set(counts.values())) == 1, (
+            f'Проверьте, что число SQL-запросов при GET-запросе к '
+            f'`{self.TITLES_URL}` не зависит от размера страницы. '
+            f'Сейчас: {counts}.'
+        )
+
+    def test_02_title_detail_query_count(self, client, titles):
+        url = f'{self.TITLES_URL}{titles[-1].id}/'
+        queries = count_queries(client, url)
+        assert queries <= 2, (
+            f'Проверьте, что GET-запрос к `{url}` загружает произведение, '
+            'категорию и жанры не более чем двумя SQL-запросами. '
+            f'Сейчас: {queries}.'
+        )
+
+    def get_token_client(self, client, user):
+        user.confirmation_code = '123456'
+        user.save()
+        response = client.post(self.TOKEN_URL, data={
+            'username': user.username, 'confirmation_code': '123456'
+        })
+        token_client = APIClient()
+        token_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}'
+        )
+        return token_client
+
+    def test_03_token_auth_without_user_query(self, client, user, admin):
+        user_client = self.get_token_client(client, user)
+        anonymous = count_queries(client, self.CATEGORIES_URL)
+        cache.clear()
+        authenticated = count_queries(user_client, self.CATEGORIES_URL)
+        assert authenticated == anonymous, (
+            f'Проверьте, что GET-запрос к `{self.CATEGORIES_URL}` с токеном '
+            f'из `{self.TOKEN_URL}` не загружает пользователя из базы.'
+        )
+        admin_client = self.get_token_client(client, admin)
+        admin_client.post(
+            self.CATEGORIES_URL, data={'name': 'Книга', 'slug': 'books'}
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                self.CATEGORIES_URL, data={'name': 'Фильм', 'slug': 'films'}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert not any(
+            'reviews_myuser' in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что при повторном запросе администратора с токеном '
+            f'из `{self.TOKEN_URL}` пользователь берётся из кэша.'
+        )
+
+    def test_04_token_user_changes_are_not_lost(self, client, user,
+                                                admin_client):
+        user_client = self.get_token_client(client, user)
+        response = user_client.post(
+            self.CATEGORIES_URL, data={'name': 'Фильм', 'slug': 'films'}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что права пользователя с токеном из '
+            f'`{self.TOKEN_URL}` определяются по его роли.'
+        )
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'moderator'}
+        )
+        response = user_client.patch(self.ME_URL, data={'bio': 'новое'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['email'] == user.email
+        user.refresh_from_db()
+        assert (user.bio, user.role) == ('новое', 'moderator'), (
+            f'Проверьте, что PATCH-запрос к `{self.ME_URL}` с токеном из '
+            f'`{self.TOKEN_URL}` не перезаписывает роль значением из токена.'
+        )
+
+    def test_05_cached_user_is_invalidated(self, user_client, admin_client,
+                                           user):
+        users_url = '/api/v1/users/'
+        first = count_queries(admin_client, users_url)
+        cache.clear()
+        second = count_queries(admin_client, users_url)
+        assert second == first - 1, (
+            f'Проверьте, что повторный запрос к `{users_url}` берёт '
+            'пользователя из кэша.'
+        )
+        response = user_client.get(users_url)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        admin_client.patch(
+            f'{users_url}{user.username}/', data={'role': 'admin'}
+        )
+        response = user_client.get(users_url)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что смена роли пользователя сразу сбрасывает его '
+            'запись в кэше.'
+        )
+
+    def test_06_catalog_response_cache(self, client, admin_client, titles):
+        url = f'{self.TITLES_URL}?limit=5'
+        first = client.get(url)
+        assert first['X-Cache'] == 'MISS'
+        assert count_queries(client, url) == 0, (
+            f'Проверьте, что повторный GET-запрос к `{url}` отдаётся из кэша.'
+        )
+        title = titles[0]
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{title.id}/', data={'name': 'Новое имя'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and any(
+            item['name'] == 'Новое имя' for item in response.json()['results']
+        ), (
+            'Проверьте, что изменение произведения сбрасывает кэш списка '
+            f'`{self.TITLES_URL}`.'
+        )
+        detail_url = f'{self.TITLES_URL}{title.id}/'
+        client.get(detail_url)
+        Review.objects.filter(title=title).first().delete()
+        response = client.get(detail_url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление отзыва сбрасывает кэш произведения.'
+        )
+
+    def test_07_conditional_get_for_reviews(self, client, user_client,
+                                            titles):
+        title = titles[0]
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит заголовок '
+            '`ETag`.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным `ETag` '
+            'возвращает ответ со статусом 304.'
+        )
+        assert not context.captured_queries, (
+            f'Проверьте, что ответ 304 на GET-запрос к `{url}` отдаётся без '
+            'SQL-запросов.'
+        )
+        review = title.reviews.first()
+        review.text = 'Изменённый текст'
+        review.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после изменения отзыва GET-запрос к `{url}` со '
+            'старым `ETag` возвращает новые данные.'
+        )
+        comments_url = f'{url}{review.id}/comments/'
+        etag = client.get(comments_url)['ETag']
+        response = user_client.post(comments_url, data={'text': 'Новый'})
+        assert response.status_code == HTTPStatus.CREATED
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после добавления комментария GET-запрос к '
+            f'`{comments_url}` со старым `ETag` возвращает новые данные.'
+        )
+
+    def test_08_reviews_cursor_pagination(self, client, titles):
+        title = titles[0]
+        url = f'{self.TITLES_URL}{title.id}/reviews/?pagination=cursor&limit=2'
+        expected = list(
+            title.reviews.order_by('pub_date', 'id').values_list(
+                'id', flat=True
+            )
+        )
+        received = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data and not any(
+                'COUNT(' in query['sql'] for query in context.captured_queries
+            ), (
+                'Проверьте, что постраничный вывод отзывов по курсору не '
+                'подсчитывает общее число записей.'
+            )
+            received.extend(review['id'] for review in data['results'])
+            url = data['next']
+        assert received == expected, (
+            'Проверьте, что курсор по `(pub_date, id)` возвращает все отзывы '
+            'произведения по порядку и без повторов.'
+        )
+
+    def test_09_cached_and_omitted_count(self, client, titles):
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        first = count_queries(client, f'{url}?limit=1')
+        second = count_queries(client, f'{url}?limit=1&offset=1')
+        assert second == first - 1, (
+            f'Проверьте, что страницы списка `{url}` с одним фильтром '
+            'берут число записей из кэша.'
+        )
+        titles[0].reviews.first().delete()
+        response = client.get(f'{url}?limit=1&offset=1')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что удаление отзыва сбрасывает кэш числа записей.'
+        )
+        response = client.get(f'{url}?limit=1&count=false')
+        data = response.json()
+        assert data['count'] is None and data['next'], (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `count=false` '
+            'не подсчитывает записи, но возвращает ссылку на следующую '
+            'страницу.'
+        )
+        response = client.get(f'{url}?limit=1&offset=1&count=false')
+        assert response.json()['next'] is None, (
+            f'Проверьте, что на последней странице `{url}` с параметром '
+            '`count=false` нет ссылки на следующую страницу.'
+        )
+
+    def test_10_title_genres_resolved_in_one_query(self, admin_client):
+        genres = [
+            Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+            for idx in range(5)
+        ]
+        Category.objects.create(name='Фильм', slug='films')
+        data = {
+            'name': 'Новое произведение', 'year': 2000, 'category': 'films',
+            'genre': [genre.slug for genre in genres],
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        genre_selects = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "reviews_genre" WHERE' in query['sql']
+        ]
+        assert len(genre_selects) == 1, (
+            f'Проверьте, что POST-запрос к `{self.TITLES_URL}` проверяет '
+            'все слаги жанров одним SQL-запросом.'
+        )
+        data['genre'] = ['genre-0', 'unknown-1', 'unknown-2']
+        response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()['genre']
+        assert len(errors) == 2 and all(
+            slug in ' '.join(errors) for slug in ('unknown-1', 'unknown-2')
+        ), (
+            f'Проверьте, что POST-запрос к `{self.TITLES_URL}` сообщает обо '
+            'всех неизвестных слагах жанров сразу.'
+        )
+        url = f'{self.TITLES_URL}{Title.objects.get().id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.patch(
+                url, data={'genre': [genre.slug for genre in genres[::-1]]}
+            )
+        assert response.status_code == HTTPStatus.OK
+        link_writes = [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_title_genre"' in query['sql']
+            and query['sql'].startswith(('DELETE', 'INSERT'))
+        ]
+        assert link_writes == [], (
+            f'Проверьте, что PATCH-запрос к `{url}` с прежним набором жанров '
+            'не перезаписывает связи произведения с жанрами.'
+        )
+        response = admin_client.patch(
+            url, data={'genre': ['genre-0', 'genre-1']}
+        )
+        assert sorted(response.json()['genre']) == ['genre-0', 'genre-1']
+        assert set(
+            Title.objects.get().genre.values_list('slug', flat=True)
+        ) == {'genre-0', 'genre-1'}, (
+            f'Проверьте, что PATCH-запрос к `{url}` заменяет жанры '
+            'произведения.'
+        )
+
+    def test_11_reviews_list_query_count(self, client, titles):
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        counts = {}
+        for limit in (1, 3):
+            counts[limit] = count_queries(client, f'{url}?limit={limit}')
+            cache.clear()
+        assert len(set(counts.values())) == 1, (
+            f'Проверьте, что число SQL-запросов при GET-запросе к `{url}` не '
+            f'зависит от размера страницы. Сейчас: {counts}.'
+        )
+        review = titles[0].reviews.first()
+        queries = count_queries(client, f'{url}{review.id}/')
+        assert queries <= 2, (
+            f'Проверьте, что GET-запрос к `{url}{review.id}/` загружает '
+            f'отзыв вместе с автором. Сейчас SQL-запросов: {queries}.'
+        )
+
+    def test_12_nested_parents_resolved_once(self, client, user,
+                                             user_client, titles):
+        review = titles[0].reviews.first()
+        url = f'{self.TITLES_URL}{titles[1].id}/reviews/{review.id}/comments/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что GET-запрос к `{url}` для отзыва другого '
+            'произведения возвращает ответ со статусом 404.'
+        )
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/{review.id}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == HTTPStatus.CREATED
+        review_selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql']
+        ]
+        assert len(review_selects) == 1, (
+            f'Проверьте, что POST-запрос к `{url}` загружает отзыв и '
+            'проверяет его произведение одним SQL-запросом.'
+        )
+        title = titles[-1]
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        title.reviews.filter(author=user).delete()
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                url, data={'text': 'Отзыв', 'score': 5}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        title_selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_title"' in query['sql']
+        ]
+        assert len(title_selects) == 1, (
+            f'Проверьте, что POST-запрос к `{url}` загружает произведение '
+            'один раз.'
+        )
+
+    def test_13_review_create_relies_on_constraints(self, user, user_client,
+                                                    titles):
+        title = titles[0]
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        title.reviews.filter(author=user).delete()
+        data = {'text': 'Отзыв', 'score': 5}
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        review_queries = [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_review"' in query['sql']
+        ]
+        assert len(review_queries) == 1, (
+            f'Проверьте, что POST-запрос к `{url}` не проверяет наличие '
+            'отзыва отдельным запросом, а сразу вставляет его. Сейчас '
+            f'SQL-запросов к отзывам: {len(review_queries)}.'
+        )
+        response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что повторный POST-запрос к `{url}` возвращает '
+            'ответ со статусом 400.'
+        )
+        assert 'non_field_errors' in response.json()
+        title.refresh_from_db()
+        assert title.rating_count == 3, (
+            'Проверьте, что отклонённый повторный отзыв не меняет рейтинг '
+            'произведения.'
+        )
+        response = user_client.post(
+            f'{self.TITLES_URL}{titles[1].id}/reviews/',
+            data={'text': 'Отзыв', 'score': 11},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        with pytest.raises(IntegrityError):
+            Review.objects.filter(pk=title.reviews.first().pk).update(
+                score=0
+            )
+
+    def test_14_demoted_admin_cannot_restore_role(self, client, admin):
+        admin_client = self.get_token_client(client, admin)
+        MyUser.objects.filter(pk=admin.pk).update(role='user')
+        response = admin_client.patch(self.ME_URL, data={'role': 'admin'})
+        assert response.status_code == HTTPStatus.OK
+        admin.refresh_from_db()
+        assert admin.role == 'user', (
+            f'Проверьте, что PATCH-запрос к `{self.ME_URL}` с токеном, '
+            'выданным до понижения роли, не возвращает роль администратора.'
+        )
+
+    def test_15_stale_token_claims(self, client, user, admin, titles):
+        users_url = '/api/v1/users/'
+        admin_client = self.get_token_client(client, admin)
+        assert admin_client.get(users_url).status_code == HTTPStatus.OK
+        admin.role = 'user'
+        admin.save()
+        response = admin_client.get(users_url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что администратор, которого понизили в роли, '
+            'теряет доступ сразу, а не после истечения токена.'
+        )
+        admin.role = 'admin'
+        admin.is_active = False
+        admin.save()
+        response = admin_client.get(users_url)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что заблокированный администратор теряет доступ '
+            'сразу, а не после истечения токена.'
+        )
+        user_client = self.get_token_client(client, user)
+        user.delete()
+        response = user_client.post(
+            f'{self.TITLES_URL}{titles[0].id}/reviews/',
+            data={'text': 'Отзыв', 'score': 5},
+        )
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что удалённый пользователь не может писать '
+            'с выданным ранее токеном.'
+        )
+
+    def test_16_count_cache_is_not_stale(self, admin_client, user, titles,
+                                         settings):
+        users_url = '/api/v1/users/'
+        before = client_count(admin_client, users_url)
+        admin_client.post(users_url, data={
+            'username': 'second', 'email': 'second@yamdb.fake',
+        })
+        data = admin_client.get(users_url).json()
+        assert data['count'] == len(data['results']) == before + 1, (
+            f'Проверьте, что создание пользователя сбрасывает кэш числа '
+            f'записей в `{users_url}`.'
+        )
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        assert client_count(admin_client, f'{url}?limit=1') == 3
+        # Запись в обход сигналов: кэш числа записей устарел.
+        Review.objects.bulk_create(
+            Review(title=titles[0], author=author, text='текст', score=5)
+            for author in MyUser.objects.filter(username='second')
+        )
+        data = admin_client.get(f'{url}?limit=1&offset=2').json()
+        assert data['next'] and len(data['results']) == 1, (
+            f'Проверьте, что страницы `{url}` за пределами устаревшего '
+            'числа записей не теряют записи и ссылку на следующую.'
+        )
+        data = admin_client.get(f'{url}?limit=1&offset=3').json()
+        assert (data['count'], data['next']) == (4, None)
+        settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD = 0
+        with mock.patch('api.pagination.estimate_count', return_value=100):
+            response = admin_client.get(f'{self.TITLES_URL}?offset=5')
+        data = response.json()
+        assert data['next'] is None and data['count'] == len(titles), (
+            'Проверьте, что на последней странице с оценкой числа записей '
+            'нет ссылки на следующую страницу.'
+        )
+
+    def test_17_review_integrity_errors_mapped(self, user, user_client,
+                                               titles):
+        title = titles[0]
+        title.reviews.filter(author=user).delete()
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        data = {'text': 'Отзыв', 'score': 5}
+        with mock.patch.object(
+            Review, 'save', side_effect=IntegrityError('constraint failed')
+        ):
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что ошибка целостности при POST-запросе к `{url}` '
+            'возвращает ответ со статусом 400, а не 500.'
+        )
+        assert 'уже оставляли' not in str(response.json())
+        with mock.patch(
+            'api.views.ReviewViewSet.get_parent',
+            return_value=Title(pk=10 ** 6, name='Удалено', year=2000),
+        ):
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что POST-запрос к `{url}` для удалённого '
+            'произведения возвращает ответ со статусом 404.'
+        )
+
+    def test_18_revocation_checked_for_every_request(self, client, user,
+                                                     admin, titles,
+                                                     settings):
+        user_client = self.get_token_client(client, user)
+        admin_client = self.get_token_client(client, admin)
+        settings.JWT_REVOCATION_CHECK = (
+            'tests.test_08_query_count.revoke_all'
+        )
+        requests = (
+            ('GET', user_client.get, self.ME_URL, {}),
+            ('POST', user_client.post,
+             f'{self.TITLES_URL}{titles[0].id}/reviews/',
+             {'text': 'Отзыв', 'score': 5}),
+            ('GET', admin_client.get, '/api/v1/users/', {}),
+        )
+        for method, send, url, data in requests:
+            response = send(url, data=data)
+            assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+                f'Проверьте, что {method}-запрос к `{url}` с отозванным '
+                'токеном возвращает ответ со статусом 401.'
+            )
+
+    def test_19_user_saves_keep_review_etags(self, client, admin_client,
+                                             user_client, user, titles):
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        etag = client.get(url)['ETag']
+        changes = (
+            ('регистрации пользователя', lambda: client.post(
+                '/api/v1/auth/signup/',
+                data={'username': 'newbie', 'email': 'newbie@yamdb.fake'},
+            )),
+            ('изменения биографии', lambda: user_client.patch(
+                self.ME_URL, data={'bio': 'Новая биография'},
+            )),
+            ('смены роли', lambda: admin_client.patch(
+                f'/api/v1/users/{user.username}/', data={'role': 'moderator'},
+            )),
+        )
+        for change, send in changes:
+            assert send().status_code in (HTTPStatus.OK, HTTPStatus.CREATED)
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f'Проверьте, что после {change} GET-запрос к `{url}` со '
+                'старым `ETag` возвращает ответ со статусом 304.'
+            )
+        response = user_client.patch(self.ME_URL, data={'username': 'renamed'})
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после смены имени автора GET-запрос к `{url}` '
+            'со старым `ETag` возвращает новые данные.'
+        )
+
+    def test_20_last_modified_is_not_stale(self, client, titles):
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        assert 'Last-Modified' not in client.get(url), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` не содержит '
+            '`Last-Modified`, пока с последней записи не прошла секунда.'
+        )
+        with mock.patch('api.mixins.time.time', return_value=time.time() + 2):
+            last_modified = client.get(url)['Last-Modified']
+            response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-Modified-Since` возвращает ответ со статусом 304.'
+        )
+        review = titles[0].reviews.first()
+        review.text = 'Изменённый текст'
+        review.save()
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` с `If-Modified-Since` '
+            'в ту же секунду, что и изменение отзыва, возвращает новые '
+            'данные.'
+        )
+
+    def test_21_cursor_pagination_with_equal_dates(self, client, titles):
+        title = titles[0]
+        title.reviews.update(pub_date=title.reviews.first().pub_date)
+        url = f'{self.TITLES_URL}{title.id}/reviews/?pagination=cursor&limit=1'
+        expected = sorted(title.reviews.values_list('id', flat=True))
+        received, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                data = client.get(url).json()
+            assert not any(
+                'OFFSET' in query['sql'] for query in context.captured_queries
+            ), (
+                'Проверьте, что курсор по `(pub_date, id)` выбирает страницу '
+                'без OFFSET даже при одинаковых датах публикации.'
+            )
+            received.extend(review['id'] for review in data['results'])
+            pages.append(data)
+            url = data['next']
+        assert received == expected, (
+            'Проверьте, что курсор возвращает все отзывы с одинаковой датой '
+            'публикации по порядку id и без повторов.'
+        )
+        received = []
+        url = pages[-1]['previous']
+        while url:
+            data = client.get(url).json()
+            received[:0] = [review['id'] for review in data['results']]
+            url = data['previous']
+        assert received == expected[:-1], (
+            'Проверьте, что ссылки `previous` курсора возвращают '
+            'предыдущие отзывы с той же датой публикации.'
+        )
@@ -0,0 +1,78 @@
+import pytest
+from django.db import connection
+
+from api.benchmark import ENDPOINTS, run_benchmark, seed_dataset
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryBudget:
+
+    @pytest.fixture
+    def context(self):
+        return seed_dataset(
+            titles=30, users=15, reviews_per_title=12, comments_per_review=12,
+            hot_review_comments=200,
+        )
+
+    @pytest.mark.parametrize(
+        'endpoint', ENDPOINTS, ids=[endpoint.name for endpoint in ENDPOINTS]
+    )
+    def test_01_endpoint_within_budget(self, context, endpoint):
+        result, = run_benchmark(context, (endpoint,), repeat=2)
+        assert result['status'] < 400, (
+            f'Проверьте, что {result["method"]}-запрос к `{result["url"]}` '
+            'выполняется успешно.'
+        )
+        assert result['queries'] <= result['max_queries'], (
+            f'Проверьте, что {result["method"]}-запрос к `{result["url"]}` '
+            f'выполняет не более {result["max_queries"]} SQL-запросов. '
+            f'Сейчас: {result["queries"]}.'
+        )
+        assert result['time_ms'] <= result['max_ms'], (
+            f'Проверьте, что {result["method"]}-запрос к `{result["url"]}` '
+            f'выполняется быстрее {result["max_ms"]} мс. '
+            f'Сейчас: {result["time_ms"]} мс.'
+        )
+
+    @pytest.mark.parametrize('name, index', (
+        ('titles-list-by-year', 'title_year'),
+        ('titles-list-filtered', 'title_genre_genre_title'),
+        ('reviews-list-cursor', 'review_title_pub_date'),
+        ('comments-list-cursor', 'comment_review_pub_date'),
+        ('comments-list-hot-deep', 'comment_review_pub_date'),
+        ('users-search', 'user_role_username_lower'),
+    ))
+    def test_02_access_pattern_indexes(self, context, name, index):
+        endpoint, = (
+            endpoint for endpoint in ENDPOINTS if endpoint.name == name
+        )
+        result, = run_benchmark(context, (endpoint,), repeat=1, explain=True)
+        plans = ' '.join(
+            line for query in result['plans'] for line in query['plan']
+        )
+        assert index in plans, (
+            f'Проверьте, что запросы к `{result["url"]}` используют индекс '
+            f'`{index}`.'
+        )
+
+    def test_03_timings_measure_database(self, context):
+        endpoint, = (
+            endpoint for endpoint in ENDPOINTS
+            if endpoint.name == 'titles-list'
+        )
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            result, = run_benchmark(context, (endpoint,), repeat=3)
+        assert len(queries) >= 3 * 3, (
+            'Проверьте, что каждый замер времени выполняется с пустым кэшем '
+            'ответов и обращается к базе.'
+        )
+        assert result['cache_hits'] == 3, (
+            'Проверьте, что повторные запросы с прогретым кэшем меряются '
+            'отдельно.'
+        )
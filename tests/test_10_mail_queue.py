@@ -0,0 +1,175 @@
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+
+from api.mail import (MailSender, enqueue_mail, mail_queue_stats,
+                      send_queued_mail)
+from reviews.models import OutgoingEmail
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10MailQueue:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def test_01_signup_enqueues_mail(self, client):
+        outbox_before_count = len(mail.outbox)
+        valid_data = {
+            'email': 'queued@yamdb.fake',
+            'username': 'queued_username'
+        }
+        client.post(self.URL_SIGNUP, data=valid_data)
+        assert len(mail.outbox) == outbox_before_count, (
+            f'Проверьте, что POST-запрос к `{self.URL_SIGNUP}` не отправляет '
+            'письмо синхронно, а ставит его в очередь.'
+        )
+        assert mail_queue_stats()['pending'] == 1, (
+            f'Проверьте, что POST-запрос к `{self.URL_SIGNUP}` добавляет '
+            'письмо с кодом подтверждения в очередь.'
+        )
+
+        call_command('send_queued_mail')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_queued_mail` отправляет письма '
+            'из очереди.'
+        )
+        stats = mail_queue_stats()
+        assert stats['pending'] == 0 and stats['avg_latency'] is not None, (
+            'Проверьте, что после отправки очередь пуста, а статистика '
+            'содержит задержку отправки.'
+        )
+
+    def test_02_failed_mail_is_retried_later(self):
+        OutgoingEmail.objects.create(
+            recipient='retry@yamdb.fake', subject='Тема', message='Текст'
+        )
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('SMTP down'),
+        ):
+            assert send_queued_mail() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and email.last_error == 'SMTP down', (
+            'Проверьте, что неудачная попытка отправки сохраняется вместе '
+            'с текстом ошибки.'
+        )
+        assert send_queued_mail() == (0, 0), (
+            'Проверьте, что повторная отправка письма откладывается.'
+        )
+        assert mail_queue_stats()['pending'] == 1
+
+    def test_03_batch_uses_single_connection(self):
+        OutgoingEmail.objects.bulk_create(
+            OutgoingEmail(
+                recipient=f'batch{idx}@yamdb.fake', subject='Тема',
+                message='Текст',
+            )
+            for idx in range(5)
+        )
+        outbox_before_count = len(mail.outbox)
+        with mock.patch(
+            'api.mail.get_connection', wraps=mail.get_connection
+        ) as get_connection:
+            call_command('send_queued_mail', batch_size=2)
+        assert len(mail.outbox) == outbox_before_count + 5, (
+            'Проверьте, что команда `send_queued_mail` отправляет все '
+            'письма из очереди.'
+        )
+        assert get_connection.call_count == 1, (
+            'Проверьте, что письма из очереди отправляются через одно '
+            'переиспользуемое соединение.'
+        )
+
+    def test_04_mail_sent_outside_transaction(self):
+        OutgoingEmail.objects.bulk_create(
+            OutgoingEmail(
+                recipient=f'lease{idx}@yamdb.fake', subject='Тема',
+                message='Текст',
+            )
+            for idx in range(3)
+        )
+        checks = []
+
+        class Sender:
+            def send(self, messages):
+                return [None] * len(messages)
+
+        class CheckingSender(Sender):
+            def send(self, messages):
+                checks.append((
+                    transaction.get_connection().in_atomic_block,
+                    send_queued_mail(sender=Sender()),
+                ))
+                return super().send(messages)
+
+        assert send_queued_mail(
+            batch_size=2, sender=CheckingSender()
+        ) == (2, 0)
+        assert checks[0] == (False, (1, 0)), (
+            'Проверьте, что письма отправляются вне транзакции, а уже '
+            'взятые в отправку письма не достаются другому обработчику.'
+        )
+        assert mail_queue_stats()['pending'] == 0
+
+    def test_05_failed_message_does_not_resend_batch(self):
+        OutgoingEmail.objects.bulk_create(
+            OutgoingEmail(
+                recipient=f'partial{idx}@yamdb.fake', subject='Тема',
+                message='Текст',
+            )
+            for idx in range(3)
+        )
+        outbox_before_count = len(mail.outbox)
+        send_messages = mail.get_connection().send_messages.__func__
+
+        def fail_second(backend, messages):
+            # Как SMTP-бэкенд: письма до ошибки уже доставлены.
+            for message in messages:
+                if message.to == ['partial1@yamdb.fake']:
+                    raise OSError('SMTP down')
+                send_messages(backend, [message])
+            return len(messages)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            fail_second,
+        ):
+            assert send_queued_mail() == (2, 1)
+        assert len(mail.outbox) == outbox_before_count + 2, (
+            'Проверьте, что после ошибки в пачке уже отправленные письма '
+            'не отправляются повторно.'
+        )
+        failed = OutgoingEmail.objects.get(sent_at__isnull=True)
+        assert failed.recipient == 'partial1@yamdb.fake'
+
+    def test_06_dropped_connection_is_reopened(self):
+        outbox_before_count = len(mail.outbox)
+        send_messages = mail.get_connection().send_messages.__func__
+        failures = [OSError('Connection unexpectedly closed')]
+
+        def drop_once(backend, messages):
+            if failures:
+                raise failures.pop()
+            return send_messages(backend, messages)
+
+        with mock.patch(
+            'api.mail.get_connection', wraps=mail.get_connection
+        ) as get_connection, MailSender() as sender:
+            enqueue_mail('first@yamdb.fake', 'Тема', 'Текст')
+            assert send_queued_mail(sender=sender) == (1, 0)
+            enqueue_mail('second@yamdb.fake', 'Код', 'Текст')
+            with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.send_messages',
+                drop_once,
+            ):
+                assert send_queued_mail(sender=sender) == (1, 0), (
+                    'Проверьте, что письмо, не ушедшее через закрытое '
+                    'сервером соединение, повторяется через новое.'
+                )
+        assert len(mail.outbox) == outbox_before_count + 2
+        assert get_connection.call_count == 2
+        email = OutgoingEmail.objects.get(recipient='second@yamdb.fake')
+        assert (email.attempts, email.last_error) == (1, '')
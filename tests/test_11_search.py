@@ -0,0 +1,256 @@
+import sys
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from api.filters import next_prefix
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11Search:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_SEARCH_URL = '/api/v1/reviews/'
+    COMMENTS_SEARCH_URL = '/api/v1/comments/'
+
+    @pytest.fixture
+    def titles(self):
+        return [
+            Title.objects.create(
+                name='Война и мир', year=1869,
+                description='Роман-эпопея о войне 1812 года',
+            ),
+            Title.objects.create(
+                name='Мир полудня', year=1962,
+                description='Цикл фантастических повестей',
+            ),
+            Title.objects.create(
+                name='Мирный атом', year=1950,
+                description=None,
+            ),
+            Title.objects.create(
+                name='Обломов', year=1859,
+                description='Роман о мирной жизни помещика',
+            ),
+        ]
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, data={'search': query})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` возвращает ответ со статусом 200.'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_search_by_name_and_description(self, client, titles):
+        assert self.search(client, 'война') == ['Война и мир'], (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` ищет по названию и описанию без учёта регистра.'
+        )
+        found = self.search(client, 'мир')
+        assert set(found) == {
+            'Война и мир', 'Мир полудня', 'Мирный атом', 'Обломов'
+        }, (
+            'Проверьте, что поиск находит слова по началу слова в названии '
+            'и описании произведения.'
+        )
+        assert set(self.search(client, 'роман мир')) == {
+            'Война и мир', 'Обломов'
+        }, (
+            'Проверьте, что поиск по нескольким словам находит произведения, '
+            'содержащие все слова.'
+        )
+        assert self.search(client, '"мир*') == self.search(client, 'мир'), (
+            'Проверьте, что синтаксис полнотекстового поиска в запросе '
+            'клиента не вызывает ошибку.'
+        )
+
+    def test_02_search_is_ranked(self, client, titles):
+        if connection.vendor != 'sqlite':
+            pytest.skip('Полнотекстовый индекс есть только в SQLite.')
+        found = self.search(client, 'мир')
+        assert found[-1] == 'Обломов', (
+            'Проверьте, что результаты поиска отсортированы по '
+            'релевантности: совпадение в названии важнее совпадения в '
+            'описании.'
+        )
+
+    def test_03_index_follows_writes(self, client, admin_client, titles):
+        title = titles[-1]
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{title.id}/', data={'name': 'Обрыв'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.search(client, 'обрыв') == ['Обрыв'], (
+            'Проверьте, что поиск находит произведение по новому названию '
+            'сразу после изменения.'
+        )
+        assert self.search(client, 'обломов') == []
+        Title.objects.filter(pk=titles[0].pk).delete()
+        assert 'Война и мир' not in self.search(client, 'мир'), (
+            'Проверьте, что удалённое произведение не находится поиском.'
+        )
+
+    def test_04_rebuild_command(self, client, titles):
+        call_command('rebuild_search_index')
+        assert self.search(client, 'полудня') == ['Мир полудня'], (
+            'Проверьте, что после команды `rebuild_search_index` поиск '
+            'работает.'
+        )
+
+    @pytest.fixture
+    def reviews(self, titles, user, moderator):
+        reviews = [
+            Review.objects.create(
+                title=titles[0], author=user, score=9,
+                text='Сильный роман, персонажи живые',
+            ),
+            Review.objects.create(
+                title=titles[0], author=moderator, score=5,
+                text='Слишком длинно, но финал сильный',
+            ),
+            Review.objects.create(
+                title=titles[1], author=user, score=7,
+                text='Добротная фантастика',
+            ),
+        ]
+        Comment.objects.create(
+            review=reviews[2], author=moderator, text='Согласен про финал',
+        )
+        Comment.objects.create(
+            review=reviews[2], author=user, text='Фантастика на любителя',
+        )
+        return reviews
+
+    def test_05_search_title_reviews(self, client, titles, reviews):
+        url = f'{self.TITLES_URL}{titles[0].id}/reviews/'
+        response = client.get(url, data={'search': 'сильн'})
+        assert response.status_code == HTTPStatus.OK
+        found = [review['id'] for review in response.json()['results']]
+        assert sorted(found) == [reviews[0].id, reviews[1].id], (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `search` '
+            'ищет по тексту отзывов произведения.'
+        )
+        response = client.get(url, data={'search': 'фантастика'})
+        assert response.json()['results'] == [], (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `search` не '
+            'возвращает отзывы на другие произведения.'
+        )
+
+    def test_06_search_all_reviews_and_comments(self, user_client,
+                                                moderator_client, titles,
+                                                reviews):
+        response = user_client.get(
+            self.REVIEWS_SEARCH_URL, data={'search': 'финал'}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что поиск по `{self.REVIEWS_SEARCH_URL}` доступен '
+            'только модераторам и администраторам.'
+        )
+        response = moderator_client.get(
+            self.REVIEWS_SEARCH_URL, data={'search': 'финал'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [
+            (review['id'], review['title_id']) for review in results
+        ] == [(reviews[1].id, titles[0].id)], (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_SEARCH_URL}` '
+            'возвращает найденные отзывы вместе с id произведения.'
+        )
+        response = moderator_client.get(
+            self.COMMENTS_SEARCH_URL, data={'search': 'фантастика'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [
+            (comment['review_id'], comment['title_id']) for comment in results
+        ] == [(reviews[2].id, titles[1].id)], (
+            f'Проверьте, что GET-запрос к `{self.COMMENTS_SEARCH_URL}` '
+            'ищет по тексту комментариев и возвращает id отзыва и '
+            'произведения.'
+        )
+
+    def test_07_review_index_follows_writes(self, moderator_client, reviews,
+                                            user_client, titles):
+        url = f'{self.TITLES_URL}{titles[1].id}/reviews/{reviews[2].id}/'
+        response = user_client.patch(url, data={'text': 'Скучная повесть'})
+        assert response.status_code == HTTPStatus.OK
+        search = moderator_client.get(
+            self.REVIEWS_SEARCH_URL, data={'search': 'скучная'}
+        ).json()['results']
+        assert [review['id'] for review in search] == [reviews[2].id], (
+            'Проверьте, что поиск по отзывам находит отзыв по новому тексту '
+            'сразу после изменения.'
+        )
+        user_client.delete(url)
+        search = moderator_client.get(
+            self.COMMENTS_SEARCH_URL, data={'search': 'финал'}
+        ).json()['results']
+        assert search == [], (
+            'Проверьте, что комментарии удалённого отзыва не находятся '
+            'поиском.'
+        )
+
+    def test_08_users_prefix_search(self, admin_client, django_user_model):
+        for username, role in (
+            ('Alpha', 'user'), ('alphabet', 'moderator'),
+            ('beta_alpha', 'user'), ('alpine', 'user'), ('Иван', 'user'),
+        ):
+            django_user_model.objects.create(
+                username=username, email=f'{username}@yamdb.fake', role=role
+            )
+        url = '/api/v1/users/'
+        response = admin_client.get(
+            url, data={'search': 'ALPH', 'search_mode': 'prefix'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        found = [user['username'] for user in response.json()['results']]
+        assert found == ['Alpha', 'alphabet'], (
+            f'Проверьте, что GET-запрос к `{url}` с параметром '
+            '`search_mode=prefix` ищет пользователей по началу имени без '
+            'учёта регистра.'
+        )
+        response = admin_client.get(
+            url, data={'search': 'al', 'search_mode': 'prefix', 'role': 'user'}
+        )
+        found = [user['username'] for user in response.json()['results']]
+        assert found == ['Alpha', 'alpine'], (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `role` '
+            'возвращает только пользователей с этой ролью.'
+        )
+        response = admin_client.get(url, data={'search': 'ALPHA'})
+        found = {user['username'] for user in response.json()['results']}
+        assert found == {'Alpha', 'alphabet', 'beta_alpha'}, (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `search` '
+            'по умолчанию ищет подстроку в имени.'
+        )
+
+    @pytest.mark.parametrize('search', ('Иван', 'иван', 'ИВАН', 'Ив', 'ва'))
+    def test_09_users_search_cyrillic(self, admin_client, django_user_model,
+                                      search):
+        django_user_model.objects.create(
+            username='Иван', email='ivan@yamdb.fake'
+        )
+        url = '/api/v1/users/'
+        for mode in ('', 'prefix'):
+            if mode and not 'иван'.startswith(search.lower()):
+                continue
+            response = admin_client.get(
+                url, data={'search': search, 'search_mode': mode}
+            )
+            found = [user['username'] for user in response.json()['results']]
+            assert found == ['Иван'], (
+                f'Проверьте, что GET-запрос к `{url}` находит пользователя '
+                'с кириллическим именем без учёта регистра.'
+            )
+
+    def test_10_next_prefix_bounds(self):
+        last = chr(sys.maxunicode)
+        assert next_prefix('ab') == 'ac'
+        assert next_prefix(f'a{last}') == 'b'
+        assert next_prefix(last) is None
+        assert next_prefix('\ud7ff') == '\ue000'
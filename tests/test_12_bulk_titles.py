@@ -0,0 +1,139 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12BulkTitles:
+
+    BULK_URL = '/api/v1/titles/bulk/'
+
+    @pytest.fixture
+    def catalog(self):
+        Category.objects.create(name='Фильм', slug='films')
+        Category.objects.create(name='Книга', slug='books')
+        for slug in ('drama', 'comedy', 'horror'):
+            Genre.objects.create(name=slug.title(), slug=slug)
+
+    def post(self, client, items):
+        return client.post(
+            self.BULK_URL, data=json.dumps(items),
+            content_type='application/json',
+        )
+
+    def test_01_bulk_permissions(self, client, user_client, catalog):
+        items = [{'name': 'Фильм', 'year': 2000, 'category': 'films',
+                  'genre': ['drama']}]
+        for api_client in (client, user_client):
+            response = self.post(api_client, items)
+            assert response.status_code in (
+                HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN
+            ), (
+                f'Проверьте, что POST-запрос к `{self.BULK_URL}` доступен '
+                'только администратору.'
+            )
+        assert not Title.objects.exists()
+
+    def test_02_bulk_create(self, admin_client, catalog):
+        items = [
+            {'name': f'Фильм {idx}', 'year': 1950 + idx,
+             'category': ('films', 'books')[idx % 2],
+             'genre': ['drama', 'comedy'][:idx % 2 + 1]}
+            for idx in range(50)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(admin_client, items)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` с корректными '
+            'данными возвращает ответ со статусом 200.'
+        )
+        results = response.json()
+        assert [result['status'] for result in results] == ['created'] * 50
+        assert len(context.captured_queries) <= 10, (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` записывает '
+            'произведения пакетно, а не по одному. Сейчас SQL-запросов: '
+            f'{len(context.captured_queries)}.'
+        )
+        for item, result in zip(items, results):
+            title = Title.objects.get(pk=result['id'])
+            assert (
+                title.name, title.category.slug,
+                sorted(title.genre.values_list('slug', flat=True)),
+            ) == (item['name'], item['category'], sorted(item['genre'])), (
+                f'Проверьте, что POST-запрос к `{self.BULK_URL}` возвращает '
+                'id созданных произведений в порядке элементов запроса.'
+            )
+
+    def test_03_bulk_update_and_errors(self, admin_client, catalog):
+        title = Title.objects.create(
+            name='Старое', year=1990, category=Category.objects.get(
+                slug='films'
+            )
+        )
+        title.genre.set(Genre.objects.filter(slug__in=('drama', 'comedy')))
+        items = [
+            {'id': title.id, 'name': 'Новое', 'genre': ['comedy', 'horror']},
+            {'name': 'Без категории', 'year': 2000, 'genre': ['drama']},
+            {'name': 'Плохой жанр', 'year': 2000, 'category': 'films',
+             'genre': ['drama', 'unknown']},
+            {'name': 'Из будущего', 'year': 3000, 'category': 'films',
+             'genre': ['drama']},
+            {'id': 100500, 'name': 'Нет такого'},
+            {'id': 2 ** 64, 'name': 'Вне диапазона'},
+            {'id': str(-2 ** 63 - 1), 'name': 'Вне диапазона'},
+        ]
+        response = self.post(admin_client, items)
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` с частично '
+            'некорректными данными возвращает ответ со статусом 207.'
+        )
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            'updated', 'error', 'error', 'error', 'error', 'error', 'error'
+        ]
+        assert 'category' in results[1]['errors']
+        assert 'genre' in results[2]['errors']
+        assert 'year' in results[3]['errors']
+        assert all('id' in result['errors'] for result in results[4:]), (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` сообщает о '
+            'несуществующем или слишком большом id в ошибках элемента.'
+        )
+        title.refresh_from_db()
+        assert (title.name, title.year) == ('Новое', 1990)
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'comedy', 'horror'
+        }, (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` заменяет жанры '
+            'изменяемого произведения.'
+        )
+        assert Title.objects.count() == 1
+
+    def test_04_bulk_ndjson(self, admin_client, catalog):
+        items = [
+            {'name': 'Первое', 'year': 2001, 'category': 'books',
+             'genre': ['drama']},
+            {'name': 'Второе', 'year': 2002, 'category': 'books',
+             'genre': ['horror']},
+        ]
+        response = admin_client.post(
+            self.BULK_URL,
+            data='\n'.join(json.dumps(item) for item in items) + '\n',
+            content_type='application/x-ndjson',
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос к `{self.BULK_URL}` принимает '
+            'произведения в формате NDJSON.'
+        )
+        assert list(
+            Title.objects.order_by('year').values_list('name', flat=True)
+        ) == ['Первое', 'Второе']
+        response = admin_client.post(
+            self.BULK_URL, data='{"name": "x"}\nnot json\n',
+            content_type='application/x-ndjson',
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,111 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Moderation:
+
+    @pytest.fixture
+    def title(self):
+        return Title.objects.create(name='Произведение', year=2000)
+
+    @pytest.fixture
+    def reviews(self, title, user, moderator, admin):
+        return [
+            Review.objects.create(
+                title=title, author=author, text='текст', score=score
+            )
+            for score, author in enumerate((user, moderator, admin), 1)
+        ]
+
+    def reviews_url(self, title):
+        return f'/api/v1/titles/{title.id}/reviews/'
+
+    def test_01_author_check_without_user_query(self, user_client, title,
+                                                reviews):
+        url = f'{self.reviews_url(title)}{reviews[0].id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.patch(url, data={'text': 'новый'})
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.patch(
+            f'{self.reviews_url(title)}{reviews[1].id}/', data={'text': 'x'}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert not any(
+            'FROM "reviews_myuser"' in query['sql']
+            and query['sql'].startswith('SELECT')
+            and 'JOIN' not in query['sql']
+            for query in context.captured_queries
+        ), (
+            f'Проверьте, что PATCH-запрос к `{url}` проверяет автора по id, '
+            'не загружая пользователя отдельным запросом.'
+        )
+
+    def bulk_delete(self, api_client, url, ids):
+        return api_client.post(
+            f'{url}bulk-delete/', data=json.dumps({'ids': ids}),
+            content_type='application/json',
+        )
+
+    def test_02_bulk_delete_by_author(self, user_client, title, reviews):
+        url = self.reviews_url(title)
+        ids = [review.id for review in reviews]
+        response = self.bulk_delete(user_client, url, ids + [100500])
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            'deleted': [reviews[0].id],
+            'forbidden': sorted(ids[1:]),
+            'not_found': [100500],
+        }, (
+            f'Проверьте, что POST-запрос к `{url}bulk-delete/` удаляет только '
+            'отзывы автора и сообщает об остальных.'
+        )
+        title.refresh_from_db()
+        assert (title.rating_count, title.rating_sum) == (2, 5), (
+            'Проверьте, что пакетное удаление отзывов пересчитывает рейтинг.'
+        )
+
+    def test_03_bulk_delete_by_moderator(self, client, moderator_client,
+                                         user, title, reviews):
+        url = self.reviews_url(title)
+        response = self.bulk_delete(client, url, [reviews[0].id])
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        comments = [
+            Comment.objects.create(review=reviews[0], author=user, text=text)
+            for text in ('первый', 'второй')
+        ]
+        comments_url = f'{url}{reviews[0].id}/comments/'
+        ids = [comment.id for comment in comments]
+        response = self.bulk_delete(moderator_client, comments_url, ids)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['deleted'] == sorted(ids), (
+            f'Проверьте, что модератор может удалить комментарии пакетом '
+            f'через `{comments_url}bulk-delete/`.'
+        )
+        response = self.bulk_delete(moderator_client, url, 'не список')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_bulk_delete_rejects_bad_input(self, moderator_client, title,
+                                              reviews):
+        url = f'{self.reviews_url(title)}bulk-delete/'
+        bodies = (
+            [reviews[0].id],
+            {'ids': [2 ** 63]},
+            {'ids': [0]},
+            {'ids': [True]},
+        )
+        for body in bodies:
+            response = moderator_client.post(
+                url, data=json.dumps(body), content_type='application/json',
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что POST-запрос к `{url}` с телом `{body}` '
+                'возвращает ответ со статусом 400.'
+            )
+        assert title.reviews.count() == len(reviews)
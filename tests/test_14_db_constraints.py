@@ -0,0 +1,133 @@
+import datetime
+from http import HTTPStatus
+
+import pytest
+from django.db import IntegrityError
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14DatabaseConstraints:
+
+    @pytest.fixture
+    def titles(self):
+        return Title.objects.bulk_create_titles(
+            Title(name=f'Произведение {idx}', year=2000 + idx)
+            for idx in range(3)
+        )
+
+    def test_01_title_year_checked_by_database(self, titles):
+        future = datetime.date.today().year + 1
+        assert all(title.pk for title in titles), (
+            'Проверьте, что `Title.objects.bulk_create_titles` проставляет '
+            'id созданным произведениям.'
+        )
+        with pytest.raises(IntegrityError):
+            Title.objects.bulk_create_titles([
+                Title(name='Прошлое', year=1990),
+                Title(name='Будущее', year=future),
+            ])
+        with pytest.raises(IntegrityError):
+            Title.objects.filter(pk=titles[0].pk).update(year=future)
+        with pytest.raises(IntegrityError):
+            Title.objects.create(name='Будущее', year=future)
+        assert Title.objects.count() == len(titles), (
+            'Проверьте, что произведение с годом выпуска больше текущего '
+            'не попадает в базу даже при пакетной записи.'
+        )
+
+    def test_02_review_score_checked_by_database(self, titles, user):
+        with pytest.raises(IntegrityError):
+            Review.objects.bulk_create_reviews([
+                Review(title=titles[0], author=user, text='текст', score=5),
+                Review(title=titles[1], author=user, text='текст', score=11),
+            ])
+        assert not Review.objects.exists(), (
+            'Проверьте, что отзыв с оценкой вне диапазона не попадает '
+            'в базу даже при пакетной записи.'
+        )
+
+    def test_03_bulk_reviews_update_ratings(self, titles, user, admin):
+        Review.objects.bulk_create_reviews(
+            Review(title=title, author=author, text='текст', score=score)
+            for title in titles[:2]
+            for score, author in ((4, user), (8, admin))
+        )
+        ratings = dict(Title.objects.values_list('pk', 'rating_count'))
+        assert ratings == {titles[0].pk: 2, titles[1].pk: 2,
+                           titles[2].pk: 0}, (
+            'Проверьте, что `Review.objects.bulk_create_reviews` '
+            'пересчитывает рейтинги затронутых произведений.'
+        )
+        updated = Review.objects.filter(author=user).update_score(10)
+        assert updated == 2
+        for title in Title.objects.filter(pk__in=[t.pk for t in titles[:2]]):
+            assert title.rating == 9, (
+                'Проверьте, что `Review.objects.update_score` '
+                'пересчитывает рейтинги затронутых произведений.'
+            )
+        with pytest.raises(IntegrityError):
+            Review.objects.filter(author=admin).update_score(0)
+        assert Title.objects.get(pk=titles[0].pk).rating == 9
+
+    def test_04_rating_survives_concurrent_updates(self, titles, user,
+                                                   admin):
+        title = titles[0]
+        Review.objects.create(title=title, author=admin, text='т', score=1)
+        review = Review.objects.create(
+            title=title, author=user, text='текст', score=5
+        )
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (10, 2), (
+            'Проверьте, что параллельные изменения оценки одного отзыва '
+            'не искажают рейтинг произведения.'
+        )
+        stale = Review.objects.get(pk=review.pk)
+        Review.objects.filter(pk=review.pk).update(score=3)
+        stale.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (1, 1), (
+            'Проверьте, что удаление отзыва с устаревшей оценкой не '
+            'искажает рейтинг произведения.'
+        )
+
+    def test_05_bulk_reviews_refresh_cached_responses(self, client,
+                                                      admin_client, titles,
+                                                      user):
+        title = titles[0]
+        title_url = f'/api/v1/titles/{title.id}/'
+        urls = (title_url, f'{title_url}reviews/')
+        search_url = '/api/v1/reviews/'
+        assert admin_client.get(search_url).json()['count'] == 0
+        changes = (
+            ('bulk_create_reviews', 4, lambda: (
+                Review.objects.bulk_create_reviews([
+                    Review(title=title, author=user, text='т', score=4),
+                ])
+            )),
+            ('update_score', 8, lambda: (
+                Review.objects.filter(author=user).update_score(8)
+            )),
+        )
+        for action, rating, change in changes:
+            etags = {url: client.get(url)['ETag'] for url in urls}
+            change()
+            for url, etag in etags.items():
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                assert response.status_code == HTTPStatus.OK, (
+                    f'Проверьте, что после `Review.objects.{action}` '
+                    f'GET-запрос к `{url}` со старым `ETag` возвращает '
+                    'новые данные.'
+                )
+            assert client.get(title_url).json()['rating'] == rating
+        assert admin_client.get(search_url).json()['count'] == 1, (
+            'Проверьте, что пакетная запись отзывов сбрасывает кэш числа '
+            f'записей в `{search_url}`.'
+        )
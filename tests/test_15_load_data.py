@@ -0,0 +1,102 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comment, Genre, MyUser, Review, Title
+
+CSV_FILES = {
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n',
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n',
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,Читатель,reader@yamdb.fake,user,,,\n'
+        '101,critic,critic@yamdb.fake,moderator,,,\n'
+    ),
+    'titles.csv': 'id,name,year,category\n1,Побег из Шоушенка,1994,1\n',
+    'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n',
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,Отлично,100,10,2020-01-13T23:20:02.422Z\n'
+        '2,1,Неплохо,101,6,2020-01-14T23:20:02.422Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Согласен,101,2020-01-15T23:20:02.422Z\n'
+    ),
+}
+# Строки, которые пакетная загрузка должна пропустить и учесть отдельно.
+INVALID_ROWS = {
+    'titles.csv': f'2,Будущее,{datetime.date.today().year + 1},1\n',
+    'review.csv': (
+        '3,1,Вне шкалы,100,11,2020-01-16T23:20:02.422Z\n'
+        '4,5,Нет произведения,100,5,2020-01-16T23:20:02.422Z\n'
+    ),
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15LoadData:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path, monkeypatch):
+        for filename, content in CSV_FILES.items():
+            (tmp_path / filename).write_text(
+                content + INVALID_ROWS.get(filename, ''), encoding='utf-8'
+            )
+        monkeypatch.setattr(
+            'reviews.management.commands.load_data.DATA_DIR',
+            f'{tmp_path}/',
+        )
+        return tmp_path
+
+    @staticmethod
+    def load(**options):
+        out = StringIO()
+        call_command('load_data', stdout=out, **options)
+        return {
+            line.split(':')[0]: line for line in out.getvalue().splitlines()
+        }
+
+    def assert_loaded(self):
+        assert Title.objects.get().genre.get() == Genre.objects.get()
+        assert Comment.objects.count() == 1
+        assert MyUser.objects.get(pk=100).username_lower == 'читатель'
+        title = Title.objects.get()
+        assert (title.rating_sum, title.rating_count) == (16, 2), (
+            'Проверьте, что `load_data` пересчитывает рейтинг произведений '
+            'после загрузки отзывов.'
+        )
+
+    def test_01_bulk_load_reports_skipped_rows(self, data_dir):
+        report = self.load(bulk=True, chunk_size=2)
+        self.assert_loaded()
+        assert set(Review.objects.values_list('pk', flat=True)) == {1, 2}
+        assert (
+            '4 rows read, 2 inserted, 0 already present, 1 skipped '
+            '(missing references), 1 skipped (constraint violations)'
+        ) in report['review.csv'], (
+            'Проверьте, что `load_data --bulk` сообщает о строках, '
+            'нарушающих ограничения базы, отдельно от уже загруженных.'
+        )
+        assert '1 skipped (constraint violations)' in report['titles.csv']
+        report = self.load(bulk=True)
+        assert (
+            '4 rows read, 0 inserted, 2 already present'
+        ) in report['review.csv'], (
+            'Проверьте, что повторная загрузка `load_data --bulk` не '
+            'вставляет строки повторно.'
+        )
+        assert Review.objects.count() == 2
+        self.assert_loaded()
+
+    def test_02_pipeline_load(self, data_dir):
+        for filename in INVALID_ROWS:
+            (data_dir / filename).write_text(
+                CSV_FILES[filename], encoding='utf-8'
+            )
+        report = self.load(workers=2)
+        assert 'Reviews imported successfully.' in report
+        self.assert_loaded()
+        assert Review.objects.get(pk=1).author_id == 100